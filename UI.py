@@ -54,7 +54,7 @@ def draw_legal_moves(screen, legal_moves):
 
 
 # New function to highlight AI moves
-def draw_ai_move(screen, from_square, to_square, duration_ms=500):
+def draw_ai_move(screen, from_square, to_square):
     from_pos = chess_square_to_position(from_square)
     to_pos = chess_square_to_position(to_square)
 
@@ -66,8 +66,6 @@ def draw_ai_move(screen, from_square, to_square, duration_ms=500):
     to_rect = pygame.Rect(to_pos[1] * SQUARE_SIZE, to_pos[0] * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
     pygame.draw.rect(screen, (255, 165, 0), to_rect, 4)  # Orange border for "to" square
 
-    pygame.display.update()
-    pygame.time.delay(duration_ms)  # Show the highlight for 500ms
 
 # def draw_move_history(screen, move_history):
 #     font = pygame.font.SysFont('comicsans', 30)
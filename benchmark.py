@@ -0,0 +1,496 @@
+"""
+Speed and consistency benchmarks for the engine.
+
+Usage:
+    python benchmark.py bench [--depth D] [--positions N]
+        Searches a fixed suite of positions to a fixed depth from empty tables
+        and prints nodes, nodes/s, time per depth, the average number of moves
+        searched at nodes with a beta cutoff, how full the transposition table
+        gets and the node-count signature.
+        The signature only changes when the search or evaluation does.
+
+    python benchmark.py perft [--depth D] [--backend bitboard|search|chess] [--fen FEN [--divide]]
+        Counts leaf nodes of the legal move tree with bulk counting at the
+        leaves. Without --fen, checks the standard perft positions against
+        their known counts and reports nodes/s; --divide prints the count
+        below every root move.
+
+    python benchmark.py eval [--positions N]
+        Checks that the bitboard and legacy evaluation backends agree on a
+        corpus of positions and reports evaluations per second for both.
+
+    python benchmark.py qs [--depth D]
+        Quiescence search nodes and time on tactical positions without
+        pruning, with SEE pruning of losing captures and with delta pruning,
+        both for a quiescence search from the position and a search to depth D.
+
+    python benchmark.py pruning [--depth D] [--positions N]
+        Null move, reverse futility and futility pruning: nodes, time to
+        every depth and changed best moves with each pruning alone and with
+        all of them, against a search without any.
+
+    python benchmark.py smp [--threads 1 2 4 8] [--depth D] [--positions N]
+        Lazy SMP scaling: searches the same positions to a fixed depth with
+        each number of processes and reports nodes/s and time-to-depth.
+
+    python benchmark.py see
+        Checks the static exchange evaluation of BitboardBoard against exact
+        expected values on hand-made exchanges.
+"""
+import argparse
+import random
+import time
+
+import chess
+
+import board_tree
+import evaluation_advanced
+from bitboard_board import BitboardBoard
+from lazy_smp import LazySMP
+from search_board import SearchBoard
+from time_manager import TimeManager
+
+
+# Opening, middlegame, tactical and endgame positions searched by the bench command
+BENCH_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 11",
+    "4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19",
+    "rq3rk1/ppp2ppp/1bnpb3/3N2B1/3NP3/7P/PPPQ1PP1/2KR3R w - - 7 14",
+    "r1bq1r1k/1pp1n1pp/1p1p4/4p2Q/4Pp2/1BNP4/PPP2PPP/3R1RK1 w - - 2 14",
+    "r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1 b - - 2 15",
+    "r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R w kq - 0 13",
+    "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16",
+    "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
+    "2rqkb1r/ppp2p2/2npb1p1/1N1Nn2p/2P1PP2/8/PP2B1PP/R1BQK2R b KQ - 0 11",
+    "r1bq1r1k/b1p1npp1/p2p3p/1p6/3PP3/1B2NN2/PP3PPP/R2Q1RK1 w - - 1 16",
+    "3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1 b - - 6 22",
+    "r1q2rk1/2p1bppp/2Pp4/p6b/Q1PNp3/4B3/PP1R1PPP/2K4R w - - 2 18",
+    "4k2r/1pb2ppp/1p2p3/1R1p4/3P4/2r1PN2/P4PPP/1R4K1 b - - 3 22",
+    "3q2k1/pb3p1p/4pbp1/2r5/PpN2N2/1P2P2P/5PP1/Q2R2K1 b - - 4 26",
+    "6k1/6p1/6Pp/ppp5/3pn2P/1P3K2/1PP2P2/3N4 b - - 0 1",
+    "3b4/5kp1/1p1p1p1p/pP1PpP1P/P1P1P3/3KN3/8/8 w - - 0 1",
+    "2K5/p7/7P/5pR1/8/5k2/r7/8 w - - 0 1",
+    "8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4 w - - 0 1",
+    "7k/3p2pp/4q3/8/4Q3/5Kp1/P6b/8 w - - 0 1",
+    "8/2p5/8/2kPKp1p/2p4P/2P5/3P4/8 w - - 0 1",
+    "8/1p3pp1/7p/5P1P/2k3P1/8/2K2P2/8 w - - 0 1",
+    "8/pp2r1k1/2p1p3/3pP2p/1P1P1P1P/P5KR/8/8 w - - 0 1",
+    "8/3p4/p1bk3p/Pp6/1Kp1PpPp/2P2P1P/2P5/5B2 b - - 0 1",
+    "5k2/7R/4P2p/5K2/p1r2P1p/8/8/8 b - - 0 1",
+    "6k1/6p1/P6p/r1N5/5p2/7P/1b3PP1/4R1K1 w - - 0 1",
+    "1r3k2/4q3/2Pp3b/3Bp3/2Q2p2/1p1P2P1/1P2KP2/3N4 w - - 0 1",
+    "6k1/4pp1p/3p2p1/P1pPb3/R7/1r2P1PP/3B1P2/6K1 w - - 0 1",
+    "8/3p3B/5p2/5P2/p7/PP5b/k7/6K1 w - - 0 1",
+    "5rk1/q6p/2p3bR/1pPp1rP1/1P1Pp3/P3B1Q1/1K3P2/R7 w - - 93 90",
+    "4rrk1/1p1nq3/p7/2p1P1pp/3P2bp/3Q1Bn1/PPPB4/1K2R1NR w - - 40 21",
+    "r3k2r/3nnpbp/q2pp1p1/p7/Pp1PPPP1/4BNN1/1P5P/R2Q1RK1 w kq - 0 16",
+    "3Qb1k1/1r2ppb1/pN1n2q1/Pp1Pp1Pr/4P2p/4BP2/4B1R1/1R5K b - - 11 40",
+    "4k3/3q1r2/1N2r1b1/3ppN2/2nPP3/1B1R2n1/2R1Q3/3K4 w - - 5 1",
+    "8/8/8/8/5kp1/P7/8/1K1N4 w - - 0 1",
+    "8/8/8/5N2/8/p7/8/2NK3k w - - 0 1",
+    "8/8/8/3k4/8/8/3KP3/8 w - - 0 1",
+    "8/8/1P6/5pr1/8/4R3/7k/2K5 w - - 0 1",
+    "8/2p4P/8/kr6/6R1/8/8/1K6 w - - 0 1",
+    "8/8/3P3k/8/1p6/8/1P6/1K3n2 b - - 0 1",
+    "8/R7/2q5/8/6k1/8/1P5p/K6R w - - 0 124",
+    "6k1/3b3r/1p1p4/p1n2p2/1PPNpP1q/P3Q1p1/1R1RB1P1/5K2 b - - 0 1",
+    "r2r1n2/pp2bk2/2p1p2p/3q4/3PN1QP/2P3R1/P4PP1/5RK1 w - - 0 1",
+    "8/8/4k3/8/2R5/8/3K4/8 w - - 0 1",
+    "8/5pk1/6p1/7p/7P/6P1/5PK1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",
+]
+
+# Tactical positions (mostly from Win At Chess) where quiescence search has many captures to resolve
+TACTICAL_FENS = [
+    "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1",
+    "5rk1/1ppb3p/p1pb4/6q1/3P1p1r/2P1R2P/PP1BQ1P1/5RKN w - - 0 1",
+    "r1bq2rk/pp3pbp/2p1p1pQ/7P/3P4/2PB1N2/PP3PPR/2KR4 w - - 0 1",
+    "5k2/6pp/p1qN4/1p1p4/3P4/2PKP2Q/PP3r2/3R4 b - - 0 1",
+    "r4q1k/p2bR1rp/2p2Q1N/5p2/5p2/2P5/PP3PPP/R5K1 w - - 0 1",
+    "3q1rk1/p4pp1/2pb3p/3p4/6Pr/1PNQ4/P1PB1PP1/4RRK1 b - - 0 1",
+    "2br2k1/2q3rn/p2NppQ1/2p1P3/Pp5R/4P3/1P3PPP/3R2K1 w - - 0 1",
+    "r1b1kb1r/3q1ppp/pBp1pn2/8/Np3P2/5B2/PPP3PP/R2Q1RK1 w kq - 0 1",
+    "4k1r1/2p3r1/1pR1p3/3pP2p/3P2qP/P4N2/1PQ4P/5R1K b - - 0 1",
+    "5rk1/pp4p1/2n1p2p/2Npq3/2p5/6P1/P3P1BP/R4Q1K w - - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+]
+
+# Exchanges with their exact static exchange evaluation in centipawns (SEE_VALUES)
+SEE_POSITIONS = [
+    ("4k3/8/2p5/3n4/4P3/8/8/4K3 w - - 0 1", "e4d5", 220),  # PxN, pxP
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),  # Undefended pawn
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),  # NxP, NxN, ... stops early
+    ("4k3/4r3/8/4p3/8/8/4R3/4R1K1 w - - 0 1", "e2e5", 100),  # The rook behind the first one recaptures
+    ("4k3/4r3/8/4p3/8/8/4R3/6K1 w - - 0 1", "e2e5", -400),  # Same without the second rook
+    ("8/8/4k3/3n4/8/8/8/3QK3 w - - 0 1", "d1d5", -580),  # The king recaptures
+    ("8/8/4k3/3n4/2P5/8/8/3QK3 w - - 0 1", "d1d5", 320),  # The king cannot recapture on a defended square
+    ("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7b8q", 800),  # Promotion
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 100),  # En passant
+]
+
+# Standard perft positions with their known leaf counts for depths 1, 2, ...
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+# Board classes perft can run on. "bitboard" is the int-move board the search makes and unmakes
+# moves on, "search" the legacy make/unmake board on chess.Move.
+PERFT_BACKENDS = {
+    "search": SearchBoard,
+    "bitboard": BitboardBoard,
+    "chess": chess.Board,
+}
+
+
+def generate_positions(count, seed=2024):
+    """Deterministic corpus of FENs sampled from random games, from the opening to bare endgames."""
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        board = chess.Board()
+        for ply in range(rng.randint(20, 200)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            # Prefer captures so that games also reach endgames
+            captures = [move for move in moves if board.is_capture(move)]
+            board.push(rng.choice(captures if captures and rng.random() < 0.5 else moves))
+            if ply % 5 == 4:
+                fens.append(board.fen())
+    return fens[:count]
+
+
+def time_evaluations(boards, use_bitboard):
+    """Evaluates every board from scratch with the chosen backend. Returns (scores, seconds)."""
+    evaluation_advanced.USE_BITBOARD_EVAL = use_bitboard
+    evaluation_advanced.pawn_cache.clear()
+    tic = time.perf_counter()
+    scores = [evaluation_advanced.evaluate_position(board) for board in boards]
+    return scores, time.perf_counter() - tic
+
+
+def run_eval_benchmark(num_positions):
+    boards = [chess.Board(fen) for fen in generate_positions(num_positions)]
+    use_bitboard = evaluation_advanced.USE_BITBOARD_EVAL
+    try:
+        legacy_scores, legacy_time = time_evaluations(boards, False)
+        bitboard_scores, bitboard_time = time_evaluations(boards, True)
+    finally:
+        evaluation_advanced.USE_BITBOARD_EVAL = use_bitboard
+        evaluation_advanced.pawn_cache.clear()
+
+    mismatches = 0
+    for board, legacy, bitboard in zip(boards, legacy_scores, bitboard_scores):
+        if abs(legacy - bitboard) > 1e-6:
+            mismatches += 1
+            print(f"Mismatch: {board.fen()} legacy={legacy} bitboard={bitboard}")
+
+    print(f"Positions: {len(boards)} | Mismatches: {mismatches}")
+    print(f"{'Backend':<10}{'Time (s)':>10}{'Evals/s':>12}")
+    print(f"{'legacy':<10}{legacy_time:>10.3f}{len(boards) / legacy_time:>12.0f}")
+    print(f"{'bitboard':<10}{bitboard_time:>10.3f}{len(boards) / bitboard_time:>12.0f}")
+    print(f"Speedup: {legacy_time / bitboard_time:.2f}x")
+    return mismatches == 0
+
+
+def run_bench(depth, num_positions):
+    fens = BENCH_FENS[:num_positions]
+    depth_nodes = [0] * (depth + 1)
+    depth_times = [0.0] * (depth + 1)
+    total_nodes = 0
+    total_time = 0.0
+    cut_nodes = moves_searched = first_move_cuts = 0
+    hashfull = 0
+    print(f"{'#':<4}{'Nodes':>10}{'Time (s)':>10}{'Best':>7}  FEN")
+    for index, fen in enumerate(fens, 1):
+        board = chess.Board(fen)
+        board_tree.clear_search_tables()  # Every position starts from empty tables, so runs are reproducible
+        evaluation_advanced.eval_cache.clear()
+        evaluation_advanced.pawn_cache.clear()
+        start_time = time.time()
+        best_move, _, _ = board_tree.iterative_deepening(board, depth, start_time, float('inf'))
+        elapsed = time.time() - start_time
+        nodes = board_tree.search_info["nodes"]
+        total_nodes += nodes
+        total_time += elapsed
+        cut_nodes += board_tree.move_ordering_stats["cut_nodes"]
+        moves_searched += board_tree.move_ordering_stats["moves_searched"]
+        first_move_cuts += board_tree.move_ordering_stats["first_move_cuts"]
+        hashfull += board_tree.transposition_table.hashfull()
+
+        previous_nodes, previous_time = 0, 0.0
+        for iteration_depth, iteration_nodes, iteration_time in board_tree.iteration_stats:
+            depth_nodes[iteration_depth] += iteration_nodes - previous_nodes
+            depth_times[iteration_depth] += iteration_time - previous_time
+            previous_nodes, previous_time = iteration_nodes, iteration_time
+        print(f"{index:<4}{nodes:>10}{elapsed:>10.3f}{str(best_move):>7}  {fen}")
+
+    print(f"\n{'Depth':<7}{'Nodes':>10}{'Time (s)':>10}{'Nodes/s':>10}")
+    for iteration_depth in range(1, depth + 1):
+        iteration_time = depth_times[iteration_depth]
+        nps = depth_nodes[iteration_depth] / iteration_time if iteration_time else 0
+        print(f"{iteration_depth:<7}{depth_nodes[iteration_depth]:>10}{iteration_time:>10.3f}{nps:>10.0f}")
+
+    print(f"\nPositions: {len(fens)} | Depth: {depth}")
+    print(f"Total time (s): {total_time:.3f}")
+    print(f"Nodes searched: {total_nodes}")
+    print(f"Nodes/second: {total_nodes / total_time:.0f}")
+    if cut_nodes:
+        print(f"Moves per cut node: {moves_searched / cut_nodes:.2f}")
+        print(f"First-move cutoffs: {100 * first_move_cuts / cut_nodes:.1f}%")
+    print(f"Average TT hashfull: {hashfull / len(fens):.0f} permille")
+    print(f"Signature: {total_nodes}")
+
+
+def perft(board, depth):
+    """Number of leaf nodes depth plies below board. The last ply is counted without being played."""
+    if depth <= 0:
+        return 1
+    if depth == 1:
+        return len(list(board.legal_moves))
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def perft_divide(board, depth):
+    """Leaf count below every root move, as (move, nodes) pairs."""
+    counts = []
+    for move in board.legal_moves:
+        board.push(move)
+        counts.append((move, perft(board, depth - 1)))
+        board.pop()
+    return counts
+
+
+def run_perft(depth, backend, fen=None, divide=False):
+    board_class = PERFT_BACKENDS[backend]
+    if fen is not None:
+        board = board_class(fen)
+        tic = time.perf_counter()
+        if divide:
+            counts = perft_divide(board, depth)
+            for move, nodes in counts:
+                print(f"{board.uci(move)}: {nodes}")
+            total = sum(nodes for _, nodes in counts)
+        else:
+            total = perft(board, depth)
+        elapsed = time.perf_counter() - tic
+        print(f"\nNodes: {total} | Time (s): {elapsed:.3f} | Nodes/s: {total / elapsed:.0f}")
+        return True
+
+    ok = True
+    total_nodes = 0
+    total_time = 0.0
+    print(f"Backend: {backend}")
+    print(f"{'Position':<11}{'Depth':>6}{'Nodes':>10}{'Expected':>10}{'Time (s)':>10}{'Nodes/s':>10}")
+    for name, position_fen, expected in PERFT_POSITIONS:
+        position_depth = min(depth, len(expected))
+        board = board_class(position_fen)
+        tic = time.perf_counter()
+        nodes = perft(board, position_depth)
+        elapsed = time.perf_counter() - tic
+        total_nodes += nodes
+        total_time += elapsed
+        status = "" if nodes == expected[position_depth - 1] else "  MISMATCH"
+        ok = ok and not status
+        print(f"{name:<11}{position_depth:>6}{nodes:>10}{expected[position_depth - 1]:>10}{elapsed:>10.3f}"
+              f"{nodes / elapsed:>10.0f}{status}")
+    print(f"\nTotal nodes: {total_nodes} | Time (s): {total_time:.3f} | Nodes/s: {total_nodes / total_time:.0f}")
+    return ok
+
+
+def run_see_check():
+    """Compares BitboardBoard.see with the exact values of SEE_POSITIONS. Returns True if all match."""
+    ok = True
+    print(f"{'Move':<7}{'SEE':>6}{'Expected':>10}  FEN")
+    for fen, uci, expected in SEE_POSITIONS:
+        board = BitboardBoard(fen)
+        value = board.see(board.int_move(chess.Move.from_uci(uci)))
+        status = "" if value == expected else "  MISMATCH"
+        ok = ok and not status
+        print(f"{uci:<7}{value:>6}{expected:>10}  {fen}{status}")
+    return ok
+
+
+def run_qs_benchmark(depth):
+    """
+    Quiescence search pruning on the tactical positions: nodes and time of a
+    quiescence search from every position and of a fixed-depth search, without
+    pruning, with SEE pruning of losing captures and with delta pruning on top.
+    The last row is the previous quiescence search (USE_LEGACY_QS) with both prunings.
+    """
+    configurations = [("none", False, False, False), ("see", False, True, False), ("see+delta", False, True, True),
+                      ("legacy", True, True, True)]
+    legacy_qs = board_tree.USE_LEGACY_QS
+    see_pruning, delta_pruning = board_tree.QS_SEE_PRUNING, board_tree.QS_DELTA_PRUNING
+    print(f"{'QS':<11}{'QS nodes':>10}{'QS (s)':>9}{'Changed':>9}{'Search nodes':>14}{'Search (s)':>12}")
+    reference_values = None
+    try:
+        for name, board_tree.USE_LEGACY_QS, board_tree.QS_SEE_PRUNING, board_tree.QS_DELTA_PRUNING in configurations:
+            qs = board_tree.quiescence_search_legacy if board_tree.USE_LEGACY_QS else board_tree.quiescence_search
+            qs_nodes = search_nodes = 0
+            qs_time = search_time = 0.0
+            values = []
+            for fen in TACTICAL_FENS:
+                board = BitboardBoard(fen)
+                color = 1 if board.turn == chess.WHITE else -1
+                board_tree.clear_search_tables()
+                evaluation_advanced.eval_cache.clear()
+                board_tree.search_info["nodes"] = 0
+                tic = time.perf_counter()
+                value, _ = qs(board, -board_tree.INF, board_tree.INF, color, board_tree.QS_MAX_DEPTH,
+                              TimeManager(time.time(), float('inf')))
+                qs_time += time.perf_counter() - tic
+                qs_nodes += board_tree.search_info["nodes"]
+                values.append(value)
+
+                board_tree.clear_search_tables()
+                evaluation_advanced.eval_cache.clear()
+                tic = time.perf_counter()
+                board_tree.iterative_deepening(chess.Board(fen), depth, time.time(), float('inf'))
+                search_time += time.perf_counter() - tic
+                search_nodes += board_tree.search_info["nodes"]
+            if reference_values is None:
+                reference_values = values
+            changed = sum(abs(value - reference) > 1e-6 for value, reference in zip(values, reference_values))
+            print(f"{name:<11}{qs_nodes:>10}{qs_time:>9.3f}{changed:>9}{search_nodes:>14}{search_time:>12.3f}")
+    finally:
+        board_tree.QS_SEE_PRUNING, board_tree.QS_DELTA_PRUNING = see_pruning, delta_pruning
+        board_tree.USE_LEGACY_QS = legacy_qs
+    print(f"\nPositions: {len(TACTICAL_FENS)} | Search depth: {depth} | "
+          f"Changed: QS values that differ from the unpruned search")
+
+
+def run_pruning_benchmark(depth, num_positions):
+    fens = BENCH_FENS[:num_positions]
+    switches = ("USE_NULL_MOVE_PRUNING", "USE_REVERSE_FUTILITY", "USE_FUTILITY_PRUNING")
+    configurations = [("none", ()), ("null move", ("USE_NULL_MOVE_PRUNING",)),
+                      ("reverse fut.", ("USE_REVERSE_FUTILITY",)), ("futility", ("USE_FUTILITY_PRUNING",)),
+                      ("all", switches)]
+    previous = {name: getattr(board_tree, name) for name in switches}
+    depth_columns = "".join(f"{f'd{iteration_depth} (s)':>9}" for iteration_depth in range(1, depth + 1))
+    print(f"{'Pruning':<14}{'Nodes':>10}{'Time (s)':>10}{depth_columns}{'Changed':>9}")
+    reference_moves = None
+    try:
+        for name, enabled in configurations:
+            for switch in switches:
+                setattr(board_tree, switch, switch in enabled)
+            nodes = 0
+            elapsed = 0.0
+            depth_times = [0.0] * (depth + 1)  # Time to complete each depth, summed over the positions
+            best_moves = []
+            for fen in fens:
+                board_tree.clear_search_tables()
+                evaluation_advanced.eval_cache.clear()
+                evaluation_advanced.pawn_cache.clear()
+                start_time = time.time()
+                best_move, _, _ = board_tree.iterative_deepening(chess.Board(fen), depth, start_time, float('inf'))
+                elapsed += time.time() - start_time
+                nodes += board_tree.search_info["nodes"]
+                best_moves.append(best_move)
+                for iteration_depth, _, iteration_time in board_tree.iteration_stats:
+                    depth_times[iteration_depth] += iteration_time
+            if reference_moves is None:
+                reference_moves = best_moves
+            changed = sum(move != reference for move, reference in zip(best_moves, reference_moves))
+            times = "".join(f"{depth_times[iteration_depth]:>9.2f}" for iteration_depth in range(1, depth + 1))
+            print(f"{name:<14}{nodes:>10}{elapsed:>10.2f}{times}{changed:>9}")
+    finally:
+        for switch, value in previous.items():
+            setattr(board_tree, switch, value)
+    print(f"\nPositions: {len(fens)} | Depth: {depth} | Changed: best moves that differ from the search without pruning")
+
+
+def run_smp_benchmark(thread_counts, depth, num_positions):
+    boards = [chess.Board(fen) for fen in generate_positions(num_positions, seed=7)]
+    print(f"{'Threads':<9}{'Nodes':>10}{'Time (s)':>10}{'Nodes/s':>10}{'Speedup':>9}")
+    base_time = None
+    for threads in thread_counts:
+        smp = LazySMP(threads)
+        try:
+            nodes = 0
+            elapsed = 0.0
+            for board in boards:
+                board_tree.transposition_table.clear()  # Every run starts from an empty table
+                start_time = time.time()
+                smp.search(board, depth, start_time, float('inf'))
+                elapsed += time.time() - start_time
+                nodes += smp.nodes
+        finally:
+            smp.close()
+        if base_time is None:
+            base_time = elapsed
+        print(f"{threads:<9}{nodes:>10}{elapsed:>10.2f}{nodes / elapsed:>10.0f}{base_time / elapsed:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = subparsers.add_parser("bench", help="fixed-depth search of the built-in suite, with a node signature")
+    bench_parser.add_argument("--depth", type=int, default=3, help="fixed search depth")
+    bench_parser.add_argument("--positions", type=int, default=len(BENCH_FENS), help="number of suite positions")
+
+    perft_parser = subparsers.add_parser("perft", help="move generation correctness and nodes/s")
+    perft_parser.add_argument("--depth", type=int, default=4)
+    perft_parser.add_argument("--backend", choices=sorted(PERFT_BACKENDS), default="bitboard",
+                              help="board class to generate moves with")
+    perft_parser.add_argument("--fen", default=None, help="single position instead of the standard suite")
+    perft_parser.add_argument("--divide", action="store_true", help="print the count below every root move")
+
+    eval_parser = subparsers.add_parser("eval", help="evaluation backend parity and evals per second")
+    eval_parser.add_argument("--positions", type=int, default=2000, help="number of positions in the corpus")
+
+    qs_parser = subparsers.add_parser("qs", help="quiescence search nodes with and without SEE/delta pruning")
+    qs_parser.add_argument("--depth", type=int, default=2, help="depth of the full search comparison")
+
+    pruning_parser = subparsers.add_parser("pruning", help="nodes and time-to-depth with null move/futility pruning")
+    pruning_parser.add_argument("--depth", type=int, default=4, help="fixed search depth")
+    pruning_parser.add_argument("--positions", type=int, default=12, help="number of suite positions")
+
+    smp_parser = subparsers.add_parser("smp", help="Lazy SMP nodes/s and time-to-depth per number of processes")
+    smp_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="process counts to compare")
+    smp_parser.add_argument("--depth", type=int, default=4, help="fixed search depth")
+    smp_parser.add_argument("--positions", type=int, default=8, help="number of positions searched")
+
+    subparsers.add_parser("see", help="static exchange evaluation against exact expected values")
+
+    args = parser.parse_args()
+    if args.command == "bench":
+        run_bench(args.depth, args.positions)
+    elif args.command == "perft":
+        if args.depth < 1:
+            parser.error("perft --depth must be at least 1")
+        ok = run_perft(args.depth, args.backend, args.fen, args.divide)
+        raise SystemExit(0 if ok else 1)
+    elif args.command == "eval":
+        ok = run_eval_benchmark(args.positions)
+        raise SystemExit(0 if ok else 1)
+    elif args.command == "qs":
+        run_qs_benchmark(args.depth)
+    elif args.command == "pruning":
+        run_pruning_benchmark(args.depth, args.positions)
+    elif args.command == "smp":
+        run_smp_benchmark(args.threads, args.depth, args.positions)
+    elif args.command == "see":
+        ok = run_see_check()
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
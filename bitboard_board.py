@@ -0,0 +1,634 @@
+import chess
+import chess.polyglot
+from chess import (BB_ALL, BB_DIAG_ATTACKS, BB_DIAG_MASKS, BB_FILE_ATTACKS, BB_FILE_MASKS, BB_KING_ATTACKS,
+                   BB_KNIGHT_ATTACKS, BB_PAWN_ATTACKS, BB_RANK_1, BB_RANK_3, BB_RANK_6, BB_RANK_8, BB_RANK_ATTACKS,
+                   BB_RANK_MASKS, BB_RAYS, BB_SQUARES, BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE)
+
+import search_board
+from dynamic_PstAndPieceValue import EG_TABLE, MG_TABLE, PHASE_VALUES, PIECE_VALUES, material_pst_scores
+from search_board import ZOBRIST_CASTLING, ZOBRIST_EP, ZOBRIST_PIECES, ZOBRIST_TURN, castling_index, pawn_zobrist_hash
+from transposition_table import decode_move
+
+# Squares strictly between two squares on a line, empty if they are not aligned
+BB_BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+
+PROMOTION_TYPES = (QUEEN, KNIGHT, ROOK, BISHOP)
+
+# Piece values of the static exchange evaluation, indexed by piece type (centipawns, opening values).
+# The king never gets captured: it only takes part in an exchange as the last capturer.
+SEE_VALUES = [0] + [PIECE_VALUES[piece_type]['opening'] for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN)] + [20000]
+
+# Castling as (king from, king to, squares that must be empty, squares that must not be attacked, rook square)
+CASTLING_MOVES = {
+    WHITE: ((4, 6, BB_SQUARES[5] | BB_SQUARES[6], (4, 5, 6), 7),
+            (4, 2, BB_SQUARES[1] | BB_SQUARES[2] | BB_SQUARES[3], (4, 3, 2), 0)),
+    BLACK: ((60, 62, BB_SQUARES[61] | BB_SQUARES[62], (60, 61, 62), 63),
+            (60, 58, BB_SQUARES[57] | BB_SQUARES[58] | BB_SQUARES[59], (60, 59, 58), 56)),
+}
+
+
+class BitboardBoard(chess.BaseBoard):
+    """
+    Board the search runs on, in place of the legacy SearchBoard. Moves are plain ints in
+    the layout of transposition_table.encode_move (from | to << 6 | promotion << 12,
+    castling as the two-square king move, 0 for the null move), so generating,
+    storing and comparing them allocates no chess.Move.
+
+    legal_moves generates pseudo-legal moves from the python-chess attack tables
+    and only runs the expensive legality test where a move can be illegal: king
+    moves, en passant, pinned pieces and evasions. The king square, checkers and
+    pinned pieces are computed once per call.
+
+    The bitboards and the attack queries of chess.BaseBoard are kept, so the
+    evaluation works unchanged, and the Zobrist keys and material+PST totals are
+    maintained incrementally like in SearchBoard. Only standard chess is supported.
+    """
+
+    def __init__(self, fen=chess.STARTING_FEN):
+        board = chess.Board(fen)
+        self.pawns = board.pawns
+        self.knights = board.knights
+        self.bishops = board.bishops
+        self.rooks = board.rooks
+        self.queens = board.queens
+        self.kings = board.kings
+        self.promoted = 0
+        self.occupied_co = [board.occupied_co[BLACK], board.occupied_co[WHITE]]
+        self.occupied = board.occupied
+        self.mailbox = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.root_fen = board.fen()
+        self.move_stack = []
+        self._stack = []
+        self.zobrist_key = chess.polyglot.zobrist_hash(board)
+        self.pawn_key = pawn_zobrist_hash(self)
+        self.mg_score, self.eg_score, self.phase_material = material_pst_scores(self)
+
+    @classmethod
+    def from_board(cls, board):
+        """Creates a board with the same position and move history as the chess.Board board."""
+        bitboard_board = cls(board.root().fen())
+        for move in board.move_stack:
+            bitboard_board.push(bitboard_board.int_move(move))
+        return bitboard_board
+
+    def copy(self):
+        board = self.__class__.__new__(self.__class__)
+        board.__dict__.update(self.__dict__)
+        board.occupied_co = self.occupied_co[:]
+        board.mailbox = self.mailbox[:]
+        board.move_stack = self.move_stack[:]
+        board._stack = self._stack[:]
+        return board
+
+    def to_board(self):
+        """chess.Board with the same position and move history."""
+        board = chess.Board(self.root_fen)
+        for move in self.move_stack:
+            board.push(self.chess_move(move))
+        return board
+
+    def fen(self):
+        return self.to_board().fen()
+
+    # --- Conversions at the boundary with python-chess ---
+
+    def int_move(self, move):
+        """chess.Move -> int move. Castling given as king takes rook becomes the two-square king move."""
+        from_square = move.from_square
+        to_square = move.to_square
+        if self.mailbox[from_square] == KING and self.occupied_co[self.turn] & BB_SQUARES[to_square]:
+            to_square = from_square + 2 if to_square > from_square else from_square - 2
+        return from_square | to_square << 6 | (move.promotion or 0) << 12
+
+    @staticmethod
+    def chess_move(move):
+        """int move -> chess.Move."""
+        return decode_move(move) or chess.Move.null()
+
+    def uci(self, move):
+        return self.chess_move(move).uci()
+
+    # --- Queries ---
+
+    def piece_type_at(self, square):
+        return self.mailbox[square] or None
+
+    def is_capture(self, move):
+        to_square = move >> 6 & 63
+        return bool(self.mailbox[to_square]) or (to_square == self.ep_square and self.mailbox[move & 63] == PAWN)
+
+    def is_zeroing(self, move):
+        return self.mailbox[move & 63] == PAWN or bool(self.mailbox[move >> 6 & 63])
+
+    def is_check(self):
+        king = (self.kings & self.occupied_co[self.turn]).bit_length() - 1
+        return bool(self.attackers_mask(not self.turn, king))
+
+    def gives_check(self, move):
+        self.push(move)
+        try:
+            return self.is_check()
+        finally:
+            self.pop()
+
+    def is_checkmate(self):
+        return self.is_check() and not self.generate_legal_moves()
+
+    def is_stalemate(self):
+        return not self.is_check() and not self.generate_legal_moves()
+
+    # Material only, same rules as python-chess
+    has_insufficient_material = chess.Board.has_insufficient_material
+    is_insufficient_material = chess.Board.is_insufficient_material
+
+    def is_search_draw(self, root_ply=0):
+        """
+        Draw test of the search, which only generates moves at the fifty-move limit:
+        fifty-move rule, insufficient material and repetition. Keys of the positions with
+        the same side to move are compared backwards up to the last capture, pawn move or
+        null move. Repeating a position reached after root_ply moves is a draw at once,
+        an earlier one must have occurred twice, as in threefold repetition.
+        """
+        if self.halfmove_clock >= 100:
+            return not self.is_checkmate()
+        if not (self.pawns | self.rooks | self.queens) and self.is_insufficient_material():
+            return True
+        key = self.zobrist_key
+        stack = self._stack
+        first = max(len(stack) - self.halfmove_clock, 0)
+        repetitions = 0
+        for index in range(len(stack) - 2, first - 1, -2):
+            if not (stack[index][0] and stack[index + 1][0]):
+                break # A null move is not reversible
+            if stack[index][5] == key:
+                repetitions += 1
+                if index >= root_ply or repetitions >= 2:
+                    return True
+        return False
+
+    # --- Move generation ---
+
+    @property
+    def legal_moves(self):
+        return self.generate_legal_moves()
+
+    def generate_pseudo_legal_moves(self, noisy=True, quiet=True):
+        """
+        Pseudo-legal moves as a list of ints: moves of pinned pieces and king moves
+        into check are included, castling only when it is legal.
+        noisy moves are captures (en passant included) and promotions, quiet moves
+        all the others; either group can be left out.
+        """
+        turn = self.turn
+        ours = self.occupied_co[turn]
+        theirs = self.occupied_co[not turn]
+        occupied = self.occupied
+        empty = ~occupied & BB_ALL
+        targets = (theirs if noisy else 0) | (empty if quiet else 0)
+        moves = []
+        append = moves.append
+
+        pieces = self.knights & ours
+        while pieces:
+            from_square = (pieces & -pieces).bit_length() - 1
+            pieces &= pieces - 1
+            attacks = BB_KNIGHT_ATTACKS[from_square] & targets
+            while attacks:
+                append(from_square | ((attacks & -attacks).bit_length() - 1) << 6)
+                attacks &= attacks - 1
+
+        pieces = (self.bishops | self.queens) & ours
+        while pieces:
+            from_square = (pieces & -pieces).bit_length() - 1
+            pieces &= pieces - 1
+            attacks = BB_DIAG_ATTACKS[from_square][BB_DIAG_MASKS[from_square] & occupied] & targets
+            while attacks:
+                append(from_square | ((attacks & -attacks).bit_length() - 1) << 6)
+                attacks &= attacks - 1
+
+        pieces = (self.rooks | self.queens) & ours
+        while pieces:
+            from_square = (pieces & -pieces).bit_length() - 1
+            pieces &= pieces - 1
+            attacks = (BB_RANK_ATTACKS[from_square][BB_RANK_MASKS[from_square] & occupied]
+                       | BB_FILE_ATTACKS[from_square][BB_FILE_MASKS[from_square] & occupied]) & targets
+            while attacks:
+                append(from_square | ((attacks & -attacks).bit_length() - 1) << 6)
+                attacks &= attacks - 1
+
+        king = (self.kings & ours).bit_length() - 1
+        attacks = BB_KING_ATTACKS[king] & targets
+        while attacks:
+            append(king | ((attacks & -attacks).bit_length() - 1) << 6)
+            attacks &= attacks - 1
+
+        if quiet and self.castling_rights:
+            moves.extend(self._castling_moves())
+
+        # Pawns: captures, then pushes, promotions expanded to every piece type
+        pawns = self.pawns & ours
+        promotion_rank = BB_RANK_8 if turn == WHITE else BB_RANK_1
+        if noisy:
+            pieces = pawns
+            while pieces:
+                from_square = (pieces & -pieces).bit_length() - 1
+                pieces &= pieces - 1
+                attacks = BB_PAWN_ATTACKS[turn][from_square] & theirs
+                while attacks:
+                    to_square = (attacks & -attacks).bit_length() - 1
+                    attacks &= attacks - 1
+                    if BB_SQUARES[to_square] & promotion_rank:
+                        for promotion in PROMOTION_TYPES:
+                            append(from_square | to_square << 6 | promotion << 12)
+                    else:
+                        append(from_square | to_square << 6)
+
+            if self.ep_square is not None:
+                capturers = BB_PAWN_ATTACKS[not turn][self.ep_square] & pawns
+                while capturers:
+                    append(((capturers & -capturers).bit_length() - 1) | self.ep_square << 6)
+                    capturers &= capturers - 1
+
+        if turn == WHITE:
+            single = pawns << 8 & empty
+            double = (single & BB_RANK_3) << 8 & empty
+            step = 8
+        else:
+            single = pawns >> 8 & empty
+            double = (single & BB_RANK_6) >> 8 & empty
+            step = -8
+        promotions = single & promotion_rank if noisy else 0
+        if quiet:
+            single &= ~promotion_rank
+        else:
+            single = double = 0
+        while promotions:
+            to_square = (promotions & -promotions).bit_length() - 1
+            promotions &= promotions - 1
+            for promotion in PROMOTION_TYPES:
+                append(to_square - step | to_square << 6 | promotion << 12)
+        while single:
+            to_square = (single & -single).bit_length() - 1
+            single &= single - 1
+            append(to_square - step | to_square << 6)
+        while double:
+            to_square = (double & -double).bit_length() - 1
+            double &= double - 1
+            append(to_square - 2 * step | to_square << 6)
+
+        return moves
+
+    def _castling_moves(self):
+        """Legal castling moves: rights, empty squares and no attacked square on the king's path."""
+        moves = []
+        them = not self.turn
+        for king_from, king_to, empty, path, rook_square in CASTLING_MOVES[self.turn]:
+            if (self.castling_rights & BB_SQUARES[rook_square] and not self.occupied & empty
+                    and not any(self.attackers_mask(them, square) for square in path)):
+                moves.append(king_from | king_to << 6)
+        return moves
+
+    def is_pseudo_legal(self, move):
+        """Whether move could have been generated by generate_pseudo_legal_moves, e.g. for a TT or killer move."""
+        if not move:
+            return False
+        turn = self.turn
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        to_mask = BB_SQUARES[to_square]
+        if not self.occupied_co[turn] & BB_SQUARES[from_square] or self.occupied_co[turn] & to_mask:
+            return False
+        piece_type = self.mailbox[from_square]
+        if piece_type == PAWN:
+            if bool(to_mask & (BB_RANK_8 | BB_RANK_1)) != (promotion in PROMOTION_TYPES):
+                return False
+            if BB_PAWN_ATTACKS[turn][from_square] & to_mask:
+                return bool(self.occupied_co[not turn] & to_mask) or to_square == self.ep_square
+            step = 8 if turn == WHITE else -8
+            if to_square == from_square + step:
+                return not self.occupied & to_mask
+            return (to_square == from_square + 2 * step and from_square >> 3 == (1 if turn == WHITE else 6)
+                    and not self.occupied & (to_mask | BB_SQUARES[from_square + step]))
+        if promotion:
+            return False
+        if piece_type == KING and to_square - from_square in (2, -2):
+            return move in self._castling_moves()
+        return bool(self.attacks_mask(from_square) & to_mask)
+
+    def _slider_blockers(self, king):
+        """Our pieces that are the only piece between our king and an enemy slider."""
+        rooks_and_queens = self.rooks | self.queens
+        bishops_and_queens = self.bishops | self.queens
+        snipers = ((BB_RANK_ATTACKS[king][0] | BB_FILE_ATTACKS[king][0]) & rooks_and_queens
+                   | BB_DIAG_ATTACKS[king][0] & bishops_and_queens) & self.occupied_co[not self.turn]
+        blockers = 0
+        while snipers:
+            sniper = (snipers & -snipers).bit_length() - 1
+            snipers &= snipers - 1
+            between = BB_BETWEEN[king][sniper] & self.occupied
+            if between and not between & (between - 1):
+                blockers |= between
+        return blockers & self.occupied_co[self.turn]
+
+    def _ep_is_safe(self, from_square, to_square, king):
+        """An en passant capture removes two pieces from a line: recheck the sliders attacking the king."""
+        capture_square = to_square - 8 if self.turn == WHITE else to_square + 8
+        occupied = (self.occupied & ~BB_SQUARES[from_square] & ~BB_SQUARES[capture_square]) | BB_SQUARES[to_square]
+        theirs = self.occupied_co[not self.turn]
+        if (BB_RANK_ATTACKS[king][BB_RANK_MASKS[king] & occupied]
+                | BB_FILE_ATTACKS[king][BB_FILE_MASKS[king] & occupied]) & (self.rooks | self.queens) & theirs:
+            return False
+        return not BB_DIAG_ATTACKS[king][BB_DIAG_MASKS[king] & occupied] & (self.bishops | self.queens) & theirs
+
+    def _is_safe(self, move, king, checkers, blockers):
+        """Whether the pseudo-legal move leaves our king out of check."""
+        turn = self.turn
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        if from_square == king:
+            # Castling was checked when it was generated
+            return to_square - from_square in (2, -2) or not self.attackers_mask(
+                not turn, to_square, self.occupied ^ BB_SQUARES[king])
+        if checkers:
+            if checkers & (checkers - 1):
+                return False  # Double check: only the king can move
+            evasions = BB_BETWEEN[king][checkers.bit_length() - 1] | checkers
+        if to_square == self.ep_square and self.mailbox[from_square] == PAWN:
+            # In check, en passant can also capture the checking pawn
+            capture_square = to_square - 8 if turn == WHITE else to_square + 8
+            if checkers and not evasions & (BB_SQUARES[to_square] | BB_SQUARES[capture_square]):
+                return False
+            return self._ep_is_safe(from_square, to_square, king)
+        if checkers and not evasions & BB_SQUARES[to_square]:
+            return False
+        return not blockers & BB_SQUARES[from_square] or bool(BB_RAYS[king][from_square] & BB_SQUARES[to_square])
+
+    def generate_legal_moves(self, noisy=True, quiet=True):
+        """Legal moves as a list of ints, see generate_pseudo_legal_moves."""
+        moves = self.generate_pseudo_legal_moves(noisy, quiet)
+        turn = self.turn
+        king = (self.kings & self.occupied_co[turn]).bit_length() - 1
+        checkers = self.attackers_mask(not turn, king)
+        blockers = self._slider_blockers(king)
+        ep_square = self.ep_square
+        if checkers:
+            return [move for move in moves if self._is_safe(move, king, checkers, blockers)]
+        # Out of check only king moves, en passant and moves of pinned pieces can be illegal
+        legal = []
+        for move in moves:
+            from_square = move & 63
+            if (from_square == king or blockers & BB_SQUARES[from_square] or move >> 6 & 63 == ep_square) \
+                    and not self._is_safe(move, king, checkers, blockers):
+                continue
+            legal.append(move)
+        return legal
+
+    def is_legal(self, move):
+        if not self.is_pseudo_legal(move):
+            return False
+        king = (self.kings & self.occupied_co[self.turn]).bit_length() - 1
+        return self._is_safe(move, king, self.attackers_mask(not self.turn, king), self._slider_blockers(king))
+
+    def see(self, move):
+        """
+        Static exchange evaluation: material won by the side to move (centipawns)
+        if move starts a sequence of captures on its target square where both
+        sides always recapture with their least valuable piece and may stop when
+        going on would lose. Sliders uncovered behind a capturer join in.
+        """
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        promotion = move >> 12
+        turn = self.turn
+        occupied = self.occupied ^ BB_SQUARES[from_square]
+        piece_type = self.mailbox[from_square]
+        victim = self.mailbox[to_square]
+        if not victim and piece_type == PAWN and to_square == self.ep_square:
+            victim = PAWN
+            occupied ^= BB_SQUARES[to_square - 8 if turn == WHITE else to_square + 8]
+        gain = [SEE_VALUES[victim]]
+        if promotion:
+            gain[0] += SEE_VALUES[promotion] - SEE_VALUES[PAWN]
+            piece_type = promotion
+        piece_value = SEE_VALUES[piece_type]  # Value of the piece standing on the square
+        side = not turn
+        pieces_by_value = ((PAWN, self.pawns), (KNIGHT, self.knights), (BISHOP, self.bishops),
+                           (ROOK, self.rooks), (QUEEN, self.queens), (KING, self.kings))
+        while True:
+            attackers = (self.attackers_mask(WHITE, to_square, occupied)
+                         | self.attackers_mask(BLACK, to_square, occupied)) & occupied
+            side_attackers = attackers & self.occupied_co[side]
+            if not side_attackers:
+                break
+            for piece_type, pieces in pieces_by_value:
+                candidates = side_attackers & pieces
+                if candidates:
+                    break
+            if piece_type == KING and attackers & self.occupied_co[not side]:
+                break  # The king cannot recapture on a defended square
+            # Gain of side if it recaptures and the exchange then stops
+            gain.append(piece_value - gain[-1])
+            occupied ^= candidates & -candidates
+            piece_value = SEE_VALUES[piece_type]
+            side = not side
+        # Back from the last capture: every side may stop instead of recapturing
+        while len(gain) > 1:
+            last = gain.pop()
+            gain[-1] = -max(-gain[-1], last)
+        return gain[0]
+
+    # --- Make / unmake ---
+
+    def _ep_hash(self):
+        """Polyglot only hashes the en passant file if a pawn could capture there."""
+        ep_square = self.ep_square
+        if BB_PAWN_ATTACKS[not self.turn][ep_square] & self.pawns & self.occupied_co[self.turn]:
+            return ZOBRIST_EP[ep_square & 7]
+        return 0
+
+    def _toggle(self, piece_type, mask):
+        if piece_type == PAWN:
+            self.pawns ^= mask
+        elif piece_type == KNIGHT:
+            self.knights ^= mask
+        elif piece_type == BISHOP:
+            self.bishops ^= mask
+        elif piece_type == ROOK:
+            self.rooks ^= mask
+        elif piece_type == QUEEN:
+            self.queens ^= mask
+        else:
+            self.kings ^= mask
+
+    def push(self, move):
+        turn = self.turn
+        key = self.zobrist_key
+        pawn_key = self.pawn_key
+        mg = self.mg_score
+        eg = self.eg_score
+        phase_material = self.phase_material
+        castling_before = self.castling_rights
+        ep_square = self.ep_square
+        captured = 0
+        halfmove_clock = self.halfmove_clock + 1
+        if ep_square is not None:
+            key ^= self._ep_hash()
+            self.ep_square = None
+
+        if move:
+            from_square = move & 63
+            to_square = move >> 6 & 63
+            promotion = move >> 12
+            from_mask = BB_SQUARES[from_square]
+            to_mask = BB_SQUARES[to_square]
+            mailbox = self.mailbox
+            occupied_co = self.occupied_co
+            ours = ZOBRIST_PIECES[turn]
+            theirs = ZOBRIST_PIECES[not turn]
+            sign = 1 if turn == WHITE else -1
+            our_mg, our_eg = MG_TABLE[turn], EG_TABLE[turn]
+            their_mg, their_eg = MG_TABLE[not turn], EG_TABLE[not turn]
+            piece_type = mailbox[from_square]
+            captured = mailbox[to_square]
+
+            if captured:
+                self._toggle(captured, to_mask)
+                occupied_co[not turn] ^= to_mask
+                key ^= theirs[captured][to_square]
+                mg += sign * their_mg[captured][to_square]
+                eg += sign * their_eg[captured][to_square]
+                phase_material -= PHASE_VALUES[captured]
+                if captured == PAWN:
+                    pawn_key ^= theirs[PAWN][to_square]
+                halfmove_clock = 0
+
+            to_piece_type = promotion or piece_type
+            if promotion:
+                self.pawns ^= from_mask
+                self._toggle(promotion, to_mask)
+                phase_material += PHASE_VALUES[promotion] - PHASE_VALUES[PAWN]
+            else:
+                self._toggle(piece_type, from_mask | to_mask)
+            occupied_co[turn] ^= from_mask | to_mask
+            mailbox[from_square] = 0
+            mailbox[to_square] = to_piece_type
+            key ^= ours[piece_type][from_square] ^ ours[to_piece_type][to_square]
+            mg += sign * (our_mg[to_piece_type][to_square] - our_mg[piece_type][from_square])
+            eg += sign * (our_eg[to_piece_type][to_square] - our_eg[piece_type][from_square])
+
+            if piece_type == PAWN:
+                halfmove_clock = 0
+                pawn_key ^= ours[PAWN][from_square]
+                if not promotion:
+                    pawn_key ^= ours[PAWN][to_square]
+                if to_square == ep_square and not captured:
+                    capture_square = to_square - 8 if turn == WHITE else to_square + 8
+                    capture_mask = BB_SQUARES[capture_square]
+                    self.pawns ^= capture_mask
+                    occupied_co[not turn] ^= capture_mask
+                    mailbox[capture_square] = 0
+                    key ^= theirs[PAWN][capture_square]
+                    pawn_key ^= theirs[PAWN][capture_square]
+                    mg += sign * their_mg[PAWN][capture_square]
+                    eg += sign * their_eg[PAWN][capture_square]
+                    phase_material -= PHASE_VALUES[PAWN]
+                elif to_square - from_square in (16, -16):
+                    self.ep_square = (from_square + to_square) >> 1
+            elif piece_type == KING:
+                self.castling_rights &= ~(BB_RANK_1 if turn == WHITE else BB_RANK_8)
+                if to_square - from_square in (2, -2):
+                    if to_square > from_square:
+                        rook_from, rook_to = from_square + 3, from_square + 1
+                    else:
+                        rook_from, rook_to = from_square - 4, from_square - 1
+                    rook_mask = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                    self.rooks ^= rook_mask
+                    occupied_co[turn] ^= rook_mask
+                    mailbox[rook_from] = 0
+                    mailbox[rook_to] = ROOK
+                    key ^= ours[ROOK][rook_from] ^ ours[ROOK][rook_to]
+                    mg += sign * (our_mg[ROOK][rook_to] - our_mg[ROOK][rook_from])
+                    eg += sign * (our_eg[ROOK][rook_to] - our_eg[ROOK][rook_from])
+            self.castling_rights &= ~(from_mask | to_mask)
+            self.occupied = occupied_co[WHITE] | occupied_co[BLACK]
+
+        self._stack.append((move, captured, castling_before, ep_square, self.halfmove_clock, self.zobrist_key,
+                            self.pawn_key, self.mg_score, self.eg_score, self.phase_material))
+        self.move_stack.append(move)
+        self.halfmove_clock = halfmove_clock
+        if turn == BLACK:
+            self.fullmove_number += 1
+        self.turn = not turn
+
+        if self.castling_rights != castling_before:
+            key ^= ZOBRIST_CASTLING[castling_index(castling_before)] ^ ZOBRIST_CASTLING[castling_index(self.castling_rights)]
+        if self.ep_square is not None:
+            key ^= self._ep_hash()
+        key ^= ZOBRIST_TURN
+        self.zobrist_key = key
+        self.pawn_key = pawn_key
+        self.mg_score = mg
+        self.eg_score = eg
+        self.phase_material = phase_material
+
+        if search_board.ZOBRIST_DEBUG:
+            board = self.to_board()
+            expected = chess.polyglot.zobrist_hash(board)
+            assert key == expected, f"Incremental Zobrist key {key:016x} != {expected:016x} after {self.uci(move)} in {board.fen()}"
+            assert pawn_key == pawn_zobrist_hash(self), f"Incremental pawn key mismatch after {self.uci(move)} in {board.fen()}"
+            assert (mg, eg, phase_material) == material_pst_scores(self), f"Incremental scores mismatch after {self.uci(move)} in {board.fen()}"
+
+    def pop(self):
+        (move, captured, self.castling_rights, self.ep_square, self.halfmove_clock, self.zobrist_key, self.pawn_key,
+         self.mg_score, self.eg_score, self.phase_material) = self._stack.pop()
+        self.move_stack.pop()
+        turn = self.turn = not self.turn
+        if turn == BLACK:
+            self.fullmove_number -= 1
+
+        if move:
+            from_square = move & 63
+            to_square = move >> 6 & 63
+            promotion = move >> 12
+            from_mask = BB_SQUARES[from_square]
+            to_mask = BB_SQUARES[to_square]
+            mailbox = self.mailbox
+            occupied_co = self.occupied_co
+            piece_type = PAWN if promotion else mailbox[to_square]
+
+            if promotion:
+                self._toggle(promotion, to_mask)
+                self.pawns ^= from_mask
+            else:
+                self._toggle(piece_type, from_mask | to_mask)
+            occupied_co[turn] ^= from_mask | to_mask
+            mailbox[from_square] = piece_type
+            mailbox[to_square] = captured
+
+            if captured:
+                self._toggle(captured, to_mask)
+                occupied_co[not turn] ^= to_mask
+            elif piece_type == PAWN and to_square == self.ep_square:
+                capture_square = to_square - 8 if turn == WHITE else to_square + 8
+                capture_mask = BB_SQUARES[capture_square]
+                self.pawns ^= capture_mask
+                occupied_co[not turn] ^= capture_mask
+                mailbox[capture_square] = PAWN
+            elif piece_type == KING and to_square - from_square in (2, -2):
+                if to_square > from_square:
+                    rook_from, rook_to = from_square + 3, from_square + 1
+                else:
+                    rook_from, rook_to = from_square - 4, from_square - 1
+                rook_mask = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                self.rooks ^= rook_mask
+                occupied_co[turn] ^= rook_mask
+                mailbox[rook_from] = ROOK
+                mailbox[rook_to] = 0
+            self.occupied = occupied_co[WHITE] | occupied_co[BLACK]
+        return move
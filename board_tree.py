@@ -7,8 +7,12 @@ import random
 import chess.polyglot # Import polyglot for opening book
 import sys
 import os
-import asyncio
 import platform
+import threading
+from transposition_table import TranspositionTable, TT_EXACT, TT_LOWERBOUND, TT_UPPERBOUND, decode_move
+from bitboard_board import BitboardBoard
+from time_manager import TimeManager, allocate_time
+from search_heuristics import MAX_PLY, SearchHeuristics
 
 script_dir = os.path.dirname(__file__)
 
@@ -21,38 +25,51 @@ else:
     STOCKFISH_PATH = os.path.join(script_dir, "stockfish/stockfish-ubuntu-x86-64-avx2")  # Đường dẫn cho Linux
 sys.setrecursionlimit(10000) # Increase recursion limit for deep searches
 
-# Define infinity
-INF = float('inf')
-
-# Define transposition table flags
-TT_EXACT = 0
-TT_LOWERBOUND = 1
-TT_UPPERBOUND = 2
+# Scores are integer centipawns. Being mated ply plies from the root scores ply - MATE (and
+# mating MATE - ply), so shorter mates score higher; beyond MATE_BOUND a score is a mate
+MATE = evaluation_advanced.MATE_SCORE
+MATE_BOUND = MATE - MAX_PLY
+# Bound of every window, above any score
+INF = MATE + 1
 
 # Define the initial delta for aspiration windows
 ASPIRATION_WINDOW_DELTA = 50 # Centipawns is a common unit
 ASPIRATION_WINDOW_DELTA_AFTER = [100, INF]
-# Transposition Table (using a dictionary for simplicity)
-transposition_table = {}
+# Transposition Table (fixed size, replaced by depth and age)
+TT_SIZE_MB = 32
+transposition_table = TranspositionTable(TT_SIZE_MB)
 
-# Add global tables for Killer Moves and History Heuristic
-MAX_SEARCH_DEPTH = 20 # Define a reasonable maximum search depth for table size
-KILLER_MOVES_COUNT = 2 # Store up to 2 killer moves per depth
 TABLEBASE_PIECE_LIMIT = 5 # Define the maximum number of pieces for Syzygy tablebase probing
 QS_MAX_DEPTH = 3 # Define the maximum depth for quiescence search
+USE_LEGACY_QS = False # Quiescence search before check evasions, TT and single-pass move classification
+QS_SEE_PRUNING = True # Skip captures that lose material by SEE in quiescence search
+QS_DELTA_PRUNING = True # Skip captures whose SEE gain cannot bring the score within QS_DELTA_MARGIN of alpha
+QS_DELTA_MARGIN = 200
 
 FUTILITY_MARGINS = [0, 200, 300] # Margins for depths 0, 1, 2 (adjust as needed)
+USE_REVERSE_FUTILITY = True # Cut when the static eval is above beta by the margin of the remaining depth
+USE_FUTILITY_PRUNING = True # Skip quiet moves when the static eval plus the margin cannot reach alpha
 
+USE_NULL_MOVE_PRUNING = True
 NMR_MIN_DEPTH = 3 # Minimum remaining depth to apply NMR
 NMR_REDUCTION = 2 # Depth reduction for the null move search
-
-move_sequence = []
-# Initialize killer moves table with None (or chess.Move.null())
-# killer_moves[depth][move_index]
-killer_moves = [[None for _ in range(KILLER_MOVES_COUNT)] for _ in range(MAX_SEARCH_DEPTH)]
-# Initialize history table
-# history_table[from_square][to_square]
-history_table = [[0 for _ in range(64)] for _ in range(64)]
+NMR_VERIFICATION_DEPTH = 6 # From this remaining depth a null move cutoff is verified by a search without null move
+
+# Set from another thread (e.g. the UI) to abort the running search
+stop_search = threading.Event()
+# Progress of the running iterative deepening, readable from other threads
+search_info = {"depth": 0, "score": None, "nodes": 0, "best_move": None, "pv": []}
+# (depth, nodes, seconds) at the end of every iteration completed by the last iterative_deepening call
+iteration_stats = []
+
+# Inside the search, moves are ints as produced by BitboardBoard (see transposition_table.encode_move)
+# Killer moves (by ply), counter-moves and history tables, aged at every root search
+heuristics = SearchHeuristics()
+# Triangular PV table: pv_table[ply][ply:pv_length[ply]] is the best line found below the node at ply
+pv_table = [[0] * MAX_PLY for _ in range(MAX_PLY)]
+pv_length = [0] * MAX_PLY
+# Beta cutoffs of the last iterative_deepening call and the moves searched at those nodes, first cutoff included
+move_ordering_stats = {"cut_nodes": 0, "moves_searched": 0, "first_move_cuts": 0}
 
 # Global variable to hold the loaded opening book
 opening_book = None
@@ -100,12 +117,12 @@ PIECE_VALUES = {
 def calculate_mvv_lva(board, move):
     """Calculates the MVV-LVA score for a capture move."""
     # Get the piece being captured (victim)
-    victim_piece_type = board.piece_type_at(move.to_square)
+    victim_piece_type = board.piece_type_at(move >> 6 & 63)
     if victim_piece_type is None: # Should not happen for a capture, but good practice
         return 0
 
     # Get the piece performing the capture (aggressor)
-    aggressor_piece_type = board.piece_type_at(move.from_square)
+    aggressor_piece_type = board.piece_type_at(move & 63)
     if aggressor_piece_type is None: # Should not happen
         return 0
 
@@ -122,85 +139,69 @@ def calculate_mvv_lva(board, move):
     return mvv_lva_score
 
 
-def order_moves(board, current_depth, principal_variation=None, hash_move=None):
+def is_good_capture(board, move):
+    """Captures (and promotions) that do not lose material according to the static exchange evaluation."""
+    return board.see(move) >= 0
+
+
+def order_moves(board, ply, principal_variation=None, hash_move=None):
 
     """
-    Orders moves for better alpha-beta pruning using MVV-LVA, Killer Moves, and History Heuristic.
+    Yields the legal moves in the order they should be searched, stage by stage:
+    hash move, PV move, good captures (MVV-LVA), killer moves, counter-move,
+    quiet moves by butterfly and continuation history, bad captures.
+    A stage is only generated and scored once the earlier ones are exhausted, so
+    a cutoff on the hash move costs no move generation at all.
     Args:
         board: The current chess board state.
-        current_depth: The current search depth (needed for Killer Moves).
-        principal_variation: The expected best line of play from shallower searches.
+        ply: Distance from the root, set up with heuristics.enter (needed for Killer Moves).
+        principal_variation: The expected best line from this node, from the previous iteration.
         hash_move: The best move from the transposition table for this position.
-
-    Returns:
-        A list of legal moves ordered by heuristics.
     """
-    legal_moves = list(board.legal_moves)
+    tried = [] # Moves yielded before their stage, skipped when the stage is generated
 
-    # 1. Prioritize Hash Move
-    ordered_moves = []
-    if hash_move and hash_move in legal_moves:
-        ordered_moves.append(hash_move)
-        legal_moves.remove(hash_move) # Remove from legal_moves to avoid duplicates later
+    # 1. Hash Move, checked for legality without generating moves
+    if hash_move and board.is_legal(hash_move):
+        tried.append(hash_move)
+        yield hash_move
 
-    # 2. Prioritize Principal Variation Move
+    # 2. Principal Variation Move
     if principal_variation:
-         pv_move = principal_variation[0] if principal_variation else None
-         if pv_move and pv_move in legal_moves:
-             ordered_moves.append(pv_move)
-             legal_moves.remove(pv_move) # Remove from legal_moves
-
-    # Separate remaining moves into captures and quiet moves
-    capture_moves = []
-    quiet_moves = []
-    for move in legal_moves:
-        if board.is_capture(move):
-            capture_moves.append(move)
-        else:
-            quiet_moves.append(move)
-
-    # 3. Order Captures using MVV-LVA
-    # Calculate MVV-LVA score for each capture move
-    capture_moves_with_scores = [(move, calculate_mvv_lva(board, move)) for move in capture_moves]
-    # Sort capture moves by MVV-LVA score in descending order
+        pv_move = principal_variation[0]
+        if pv_move not in tried and board.is_legal(pv_move):
+            tried.append(pv_move)
+            yield pv_move
+
+    # 3. Good Captures by MVV-LVA; those losing material by SEE are kept for the last stage
+    capture_moves_with_scores = [(move, calculate_mvv_lva(board, move))
+                                 for move in board.generate_legal_moves(quiet=False) if move not in tried]
     capture_moves_with_scores.sort(key=lambda item: item[1], reverse=True)
-    sorted_capture_moves = [move for move, score in capture_moves_with_scores]
-
-    # 4. Prioritize Killer Moves (for the current depth) within Quiet Moves
-    killer_moves_for_depth = []
-    if 0 <= current_depth < MAX_SEARCH_DEPTH:
-        killer_moves_for_depth = killer_moves[current_depth]
-
-    killer_moves_to_add = []
-    remaining_quiet_moves = []
-    for move in quiet_moves:
-        if move in killer_moves_for_depth:
-            killer_moves_to_add.append(move)
+    bad_captures = []
+    for move, score in capture_moves_with_scores:
+        if is_good_capture(board, move):
+            yield move
         else:
-            remaining_quiet_moves.append(move)
-
-    # 5. Order Remaining Quiet Moves using History Heuristic
-    # Calculate history score for each remaining quiet move
-    quiet_moves_with_scores = [(move, history_table[move.from_square][move.to_square]) for move in remaining_quiet_moves]
-    # Sort quiet moves by history score in descending order
-    quiet_moves_with_scores.sort(key=lambda item: item[1], reverse=True)
-    sorted_quiet_moves = [move for move, score in quiet_moves_with_scores]
+            bad_captures.append(move)
 
+    # 4. Killer Moves (for the current ply), quiet moves only
+    for move in heuristics.killers[ply][:]: # Copied, the node updates the table meanwhile
+        if move and move not in tried and not board.is_capture(move) and not move >> 12 and board.is_legal(move):
+            tried.append(move)
+            yield move
 
-    # Combine all ordered move types
-    ordered_moves.extend(sorted_capture_moves)
-    ordered_moves.extend(killer_moves_to_add) # Add killer moves after captures
-    ordered_moves.extend(sorted_quiet_moves) # Add history-ordered quiet moves after killers
+    # 5. Counter-Move: the quiet move that last refuted the opponent's previous move
+    move = heuristics.counter_move(ply)
+    if move and move not in tried and not board.is_capture(move) and not move >> 12 and board.is_legal(move):
+        tried.append(move)
+        yield move
 
-    # Remove any potential duplicates that might have slipped through (less likely now but safe)
-    seen = set()
-    ordered_moves_unique = []
-    for move in ordered_moves:
-        if move not in seen:
-            ordered_moves_unique.append(move)
-            seen.add(move)
+    # 6. Remaining Quiet Moves by History Heuristic
+    quiet_moves = [move for move in board.generate_legal_moves(noisy=False) if move not in tried]
+    quiet_moves.sort(key=heuristics.quiet_score(board, ply), reverse=True)
+    yield from quiet_moves
 
-    return ordered_moves_unique
+    # 7. Bad Captures
+    yield from bad_captures
 
 def order_moves_tablebase(board):
     """
@@ -216,20 +217,151 @@ def order_moves_tablebase(board):
         else:
             other_moves.append(move)
     return zeroing_moves + other_moves
-    
+
+# Length of the move stack of the search board at the root, to tell the ply of a node
+root_ply = 0
+
+def score_to_tt(value, ply):
+    """Mate scores go into the transposition table as distances from the node, not from the root."""
+    if value >= MATE_BOUND:
+        return value + ply
+    if value <= -MATE_BOUND:
+        return value - ply
+    return value
+
+def score_from_tt(value, ply):
+    """Inverse of score_to_tt for a node ply plies from the root. The table stores floats."""
+    value = int(value)
+    if value >= MATE_BOUND:
+        return value - ply
+    if value <= -MATE_BOUND:
+        return value + ply
+    return value
+
+def format_score(value):
+    """'+1.25' in pawns, or 'M3' / '-M3' for a mate in 3 moves for / against the side to move."""
+    value = int(value)
+    if abs(value) >= MATE_BOUND:
+        moves = (MATE - abs(value) + 1) // 2
+        return f"M{moves}" if value > 0 else f"-M{moves}"
+    return f"{value / 100:+.2f}"
+
 cnt = 0
-# Assuming quiescence_search is implemented as previously discussed
-# (It will also need to accept start_time and stop_time)
-def quiescence_search(board, alpha, beta, color, qs_depth, start_time, stop_time):
-    global move_sequence
+def quiescence_search(board, alpha, beta, color, qs_depth, clock):
+    """
+    Performs a limited depth search focusing on noisy positions (captures, promotions, checks).
+    The legal moves are classified in a single pass, so a checking capture is searched once.
+    In check there is no stand pat and every evasion is searched. Results are probed in and
+    stored to the transposition table at depth 0. Includes time checks.
+    """
+    # --- Time Check (reads the clock every TIME_CHECK_NODES nodes) ---
+    if clock.time_up():
+        return None, None # Signal termination due to time
+    # --- End Time Check ---
+    search_info["nodes"] += 1
+    ply = len(board.move_stack) - root_ply
+
+    # --- Transposition Table Lookup ---
+    board_hash = board.zobrist_key
+    tt_entry = transposition_table.probe(board_hash)
+    hash_move = 0
+    if tt_entry is not None:
+        tt_value, tt_depth, tt_flag, hash_move = tt_entry
+        tt_value = score_from_tt(tt_value, ply)
+        if (tt_flag == TT_EXACT or (tt_flag == TT_LOWERBOUND and tt_value >= beta)
+                or (tt_flag == TT_UPPERBOUND and tt_value <= alpha)):
+            return tt_value, hash_move or None
+
+    if qs_depth == 0:
+        # The static evaluation does not look for mate, only a position in check can be one
+        if board.is_check() and not board.legal_moves:
+            return ply - MATE, None
+        return evaluation_advanced.evaluate(board) * color, None # Return value and None for move
+
+    original_alpha = alpha
+    if board.is_check():
+        # --- Check Evasions: no stand pat, every legal move is searched ---
+        stand_pat = None
+        best_value = -INF
+        moves = board.legal_moves
+        if not moves:
+            return ply - MATE, None # Checkmated
+    else:
+        stand_pat = evaluation_advanced.evaluate(board) * color
+        if stand_pat >= beta:
+            return stand_pat, None # Stalemate is only noticed below beta, where it changes the result
+        legal_moves = board.legal_moves
+        if not legal_moves:
+            return 0, None # Stalemated
+        alpha = max(alpha, stand_pat)
+        best_value = stand_pat
+
+        # --- Single classification pass: captures and promotions, then quiet checking moves ---
+        noisy_moves = []
+        check_moves = []
+        for move in legal_moves:
+            if board.is_capture(move) or move >> 12:
+                noisy_moves.append(move)
+            elif board.gives_check(move):
+                check_moves.append(move)
+        noisy_moves.sort(key=lambda move: calculate_mvv_lva(board, move), reverse=True)
+        moves = noisy_moves + check_moves
+
+    if hash_move in moves:
+        moves.remove(hash_move)
+        moves.insert(0, hash_move)
+
+    best_move = None
+    for move in moves:
+        # --- SEE and Delta Pruning of captures (not of check evasions) ---
+        if stand_pat is not None and (QS_SEE_PRUNING or QS_DELTA_PRUNING) and board.is_capture(move):
+            see_value = board.see(move)
+            if QS_SEE_PRUNING and see_value < 0:
+                continue # Loses material even if the opponent only recaptures when it pays
+            if QS_DELTA_PRUNING and stand_pat + see_value + QS_DELTA_MARGIN <= alpha:
+                continue # Even winning the exchange cannot raise alpha
+
+        board.push(move)
+        value, _ = quiescence_search(board, -beta, -alpha, -color, qs_depth - 1, clock)
+        board.pop()
+
+        # --- Handle Time Termination from recursive call ---
+        if value is None:
+             return None, None # Propagate the termination signal
+        value = -value
+
+        if value > best_value:
+            best_value = value
+            best_move = move
+
+        alpha = max(alpha, best_value)
+        if alpha >= beta:
+            break
+
+    # --- Transposition Table Store (never over a result of the main search) ---
+    # Only full-length quiescence searches are stored: one cut short by qs_depth would
+    # be reused where more quiescence plies are left and could miss their tactics
+    if qs_depth == QS_MAX_DEPTH and (tt_entry is None or tt_depth == 0):
+        flag = TT_EXACT
+        if best_value <= original_alpha:
+            flag = TT_UPPERBOUND
+        elif best_value >= beta:
+            flag = TT_LOWERBOUND
+        transposition_table.store(board_hash, 0, flag, score_to_tt(best_value, ply), best_move or 0)
+
+    return best_value, best_move
+
+def quiescence_search_legacy(board, alpha, beta, color, qs_depth, clock):
     """
+    Previous quiescence search, kept for comparison (USE_LEGACY_QS and benchmark.py qs).
     Performs a limited depth search focusing on noisy positions (captures, checks).
     Includes time checks.
     """
-    # --- Time Check ---
-    if time.time() > stop_time:
+    # --- Time Check (reads the clock every TIME_CHECK_NODES nodes) ---
+    if clock.time_up():
         return None, None # Signal termination due to time
     # --- End Time Check ---
+    search_info["nodes"] += 1
 
     if qs_depth == 0:
         return evaluation_advanced.evaluate(board) * color, None # Return value and None for move
@@ -239,7 +371,7 @@ def quiescence_search(board, alpha, beta, color, qs_depth, start_time, stop_time
     if alpha >= beta:
         return stand_pat, None
 
-    legal_moves = list(board.legal_moves)
+    legal_moves = board.legal_moves
     capture_moves = [move for move in legal_moves if board.is_capture(move)]
     check_moves = [move for move in legal_moves if board.gives_check(move)]
     noisy_moves = capture_moves + check_moves # + check_moves if implemented
@@ -251,13 +383,19 @@ def quiescence_search(board, alpha, beta, color, qs_depth, start_time, stop_time
     best_move = None # Keep track of best move in QS if needed, though typically not returned
 
     for move in noisy_moves:
+        # --- SEE and Delta Pruning of captures ---
+        if (QS_SEE_PRUNING or QS_DELTA_PRUNING) and board.is_capture(move):
+            see_value = board.see(move)
+            if QS_SEE_PRUNING and see_value < 0:
+                continue # Loses material even if the opponent only recaptures when it pays
+            if QS_DELTA_PRUNING and stand_pat + see_value + QS_DELTA_MARGIN <= alpha:
+                continue # Even winning the exchange cannot raise alpha
+
         board.push(move)
-        move_sequence.append(str(move))
-        
+
         # Recursive call to quiescence search with time parameters
-        value, _ = quiescence_search(board, -beta, -alpha, -color, qs_depth - 1, start_time, stop_time)
+        value, _ = quiescence_search_legacy(board, -beta, -alpha, -color, qs_depth - 1, clock)
         board.pop()
-        move_sequence.pop() # Unmake the move from the sequence
 
         # --- Handle Time Termination from recursive call ---
         if _ is None and value is None:
@@ -295,57 +433,67 @@ def calculate_lmr_reduction(depth, move_index):
     return max(0, reduction)
 
 max_depth_current = 0
-def negamax(board, depth, alpha, beta, color, start_time, stop_time, principal_variation=None):
+def negamax(board, depth, alpha, beta, color, clock, principal_variation=None, null_move_allowed=True):
     """
     Negamax implementation with Alpha-Beta, Transposition Table, Time Control,
-    and updates for Killer/History heuristics.
+    null move and futility pruning, and updates for Killer/History heuristics.
+    principal_variation is the PV of the previous iteration from this node, None off the PV;
+    the line found is left in pv_table[ply].
+    null_move_allowed is False right after a null move and in verification searches.
     """
     global cnt, max_depth_current
-    # --- Time Check ---
-    if time.time() > stop_time:
+    # --- Time Check (reads the clock every TIME_CHECK_NODES nodes) ---
+    if clock.time_up():
         return None, None # Signal termination due to time
+    search_info["nodes"] += 1
+    ply = len(board.move_stack) - root_ply
+    pv_length[ply] = ply # No line below this node until a move raises alpha
+    if ply >= MAX_PLY - 1:
+        return evaluation_advanced.evaluate(board) * color, None
 
     if max_depth_current - 1 == depth:
         cnt += 1
     # --- Check for Immediate Game Over ---
-    # Check this BEFORE transposition table lookup or depth check for terminal nodes
-    if board.is_game_over(claim_draw=True): # claim_draw=True includes 50-move, 3-fold rep
-        if board.is_checkmate():
-            # The player whose turn it IS is checkmated. This is the worst possible outcome.
-            return -INF, None
-        else:
-            # Any other draw condition (stalemate, repetition, 50-move, insufficient material)
-            return 0, None
+    # Check this BEFORE transposition table lookup or depth check for terminal nodes.
+    # Draws by rule are caught here from the key stack and the halfmove clock; checkmate and
+    # stalemate need the legal moves, so they are detected where the moves are generated:
+    # after the move loop, or in quiescence search at depth 0.
+    if ply > 0 and board.is_search_draw(root_ply):
+        return 0, None
     # --- End Immediate Game Over Check ---
 
-    board_hash = chess.polyglot.zobrist_hash(board)
+    # --- Mate Distance Pruning: nothing here beats a mate already found closer to the root ---
+    if ply > 0:
+        alpha = max(alpha, ply - MATE)
+        beta = min(beta, MATE - ply - 1)
+        if alpha >= beta:
+            return alpha, None
+
+    board_hash = board.zobrist_key # Maintained incrementally by BitboardBoard.push/pop
     # --- Transposition Table Lookup ---
-    # (Keep existing TT lookup logic)
-    if board_hash in transposition_table:
-       entry = transposition_table[board_hash]
+    tt_entry = transposition_table.probe(board_hash)
+    hash_move = None
+    if tt_entry is not None:
+       tt_value, tt_depth, tt_flag, tt_move = tt_entry
+       tt_value = score_from_tt(tt_value, ply)
+       hash_move = tt_move or None
        # Check if TT entry depth is sufficient ONLY IF the game isn't already over
        # (The game over check above takes precedence over TT)
-       if entry['depth'] >= depth:
-            tt_value = entry['value']
-            # Be careful using TT values for checkmate/stalemate if not stored correctly
-            # The absolute -INF/0 values from the game over check are more reliable
-
-            if entry['flag'] == TT_EXACT:
-                # Ensure we don't return a TT score that contradicts a proven mate/draw
-                if tt_value == -INF or tt_value == 0: # Assuming TT stores absolute mate/draw scores correctly
-                     return tt_value, entry.get('best_move')
-                # Otherwise, proceed with caution or re-verify if needed
-                # For now, let's trust the TT if flag is EXACT and depth sufficient
-                return tt_value, entry.get('best_move')
-
-            elif entry['flag'] == TT_LOWERBOUND:
+       # No cutoffs at PV nodes (open window), which would cut the PV short
+       if tt_depth >= depth and beta - alpha <= 1:
+            # Mate scores are stored as distances from the stored position and were
+            # converted back to distances from the root above
+            if tt_flag == TT_EXACT:
+                return tt_value, hash_move
+
+            elif tt_flag == TT_LOWERBOUND:
                 alpha = max(alpha, tt_value)
-            elif entry['flag'] == TT_UPPERBOUND:
+            elif tt_flag == TT_UPPERBOUND:
                 beta = min(beta, tt_value)
 
             if alpha >= beta:
                 # Return the TT value that caused the cutoff
-                return tt_value, entry.get('best_move')
+                return tt_value, hash_move
 
 
     # --- Depth Limit Reached (Base case) ---
@@ -353,29 +501,64 @@ def negamax(board, depth, alpha, beta, color, start_time, stop_time, principal_v
         # If depth is 0 and we already know game isn't over (from check above),
         # go to quiescence search.
         # Quiescence search should return the score relative to the current player.
-        value, _ = quiescence_search(board, alpha, beta, color, QS_MAX_DEPTH, start_time, stop_time)
-        if value is None and _ is None: return None, None # Handle timeout from QS
+        qs = quiescence_search_legacy if USE_LEGACY_QS else quiescence_search
+        value, _ = qs(board, alpha, beta, color, QS_MAX_DEPTH, clock)
+        if value is None: return None, None # Handle timeout from QS
         return value, None
 
-    # --- Get hash move for move ordering ---
-    hash_move = transposition_table.get(board_hash, {}).get('best_move')
+    # --- Static Pruning (not in check and not at PV nodes, where the window is open) ---
+    futility_prunable = False
+    if beta - alpha <= 1 and not board.is_check():
+        static_eval = evaluation_advanced.evaluate(board) * color
+
+        # Reverse futility (static null move): far enough above beta to fail high without searching
+        if (USE_REVERSE_FUTILITY and depth < len(FUTILITY_MARGINS) and beta < MATE_BOUND
+                and static_eval - FUTILITY_MARGINS[depth] >= beta):
+            return static_eval - FUTILITY_MARGINS[depth], None
+
+        # Null move: if passing still fails high at reduced depth, some real move will too.
+        # Skipped with only pawns left, where zugzwang makes passing better than any move.
+        if (USE_NULL_MOVE_PRUNING and null_move_allowed and depth >= NMR_MIN_DEPTH and static_eval >= beta
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            board.push(0)
+            value, _ = negamax(board, depth - 1 - NMR_REDUCTION, -beta, -beta + 1, -color, clock, None, False)
+            board.pop()
+            if value is None:
+                return None, None
+            value = -value
+            if value >= beta and depth >= NMR_VERIFICATION_DEPTH:
+                # Verification search: the same reduced depth, with real moves only
+                value, _ = negamax(board, depth - 1 - NMR_REDUCTION, beta - 1, beta, color, clock,
+                                   principal_variation, False)
+                if value is None:
+                    return None, None
+            if value >= beta:
+                return (beta if value >= MATE_BOUND else value), None # A mate found after passing is not proven
+
+        # Frontier futility: quiet moves are skipped in the move loop
+        futility_prunable = (USE_FUTILITY_PRUNING and depth < len(FUTILITY_MARGINS)
+                             and static_eval + FUTILITY_MARGINS[depth] <= alpha)
 
     # --- Order moves using advanced heuristics ---
-    move_order = order_moves(board, depth, principal_variation, hash_move)
+    heuristics.enter(board, ply)
+    move_order = order_moves(board, ply, principal_variation, hash_move)
+    # Only the PV move leads further along the previous iteration's PV
+    pv_move = principal_variation[0] if principal_variation else None
 
     best_value = -INF # Start with the worst possible score
     best_move = None
     original_alpha = alpha # Store original alpha for TT flag determination
 
+    move_index = -1
     for move_index, move in enumerate(move_order):
+        is_quiet = not board.is_capture(move) and not move >> 12
 
-        # --- Time Check ---
-        if time.time() > stop_time:
-             return None, None
-        # --- End Time Check ---
+        # --- Futility Pruning: a quiet move cannot bring the score up to alpha ---
+        if futility_prunable and move_index > 0 and is_quiet and not board.gives_check(move):
+            continue
 
         board.push(move)
-        move_sequence.append(str(move))
+        move_pv = principal_variation[1:] if move == pv_move else None
 
         # --- Principal Variation Search (PVS) and Late Move Reductions (LMR) ---
         should_do_full_depth_search = False
@@ -395,12 +578,11 @@ def negamax(board, depth, alpha, beta, color, start_time, stop_time, principal_v
             # Only do null window if reduced depth is > 0. If reduced depth is 0,
             # it will go directly to quiescence search.
             if current_search_depth > 0:
-                 # Perform a null window search [beta - 1, beta]
-                 value, _ = negamax(board, current_search_depth, -beta, -(alpha + 1), -color, start_time, stop_time, principal_variation) # Note: alpha + 1 for null window
+                 # Perform a null window search [alpha, alpha + 1]
+                 value, _ = negamax(board, current_search_depth, -(alpha + 1), -alpha, -color, clock, move_pv) # Note: alpha + 1 for null window
                  # --- Handle Time Termination ---
                  if value is None:
                       board.pop() # Unmake before returning on time out
-                      move_sequence.pop()
                       return None, None
                  # --- End Time Termination Handling ---
                  value = -value # Negate the value from the recursive call
@@ -427,27 +609,41 @@ def negamax(board, depth, alpha, beta, color, start_time, stop_time, principal_v
 
              # The window for the recursive call is always [-beta, -alpha] from the opponent's perspective.
              # The value is negated after the call.
-             
-
-             value, _ = negamax(board, depth - 1, -beta, -alpha, -color, start_time, stop_time, principal_variation)
-
-
-             # --- Handle Time Termination ---
-             if value is None and _ is None:
-                  board.pop()
-                  move_sequence.pop() # Unmake before returning on time out
-                  return None, None
-             value = -value # Negate value
-             # --- End Time Termination Handling ---
+             # At PV nodes, moves after the first are tried with a null window first and only
+             # re-searched with the full window if they land inside it.
+             full_window = True
+             if move_index > 0 and beta - alpha > 1:
+                  value, _ = negamax(board, depth - 1, -(alpha + 1), -alpha, -color, clock, move_pv)
+                  if value is None:
+                       board.pop() # Unmake before returning on time out
+                       return None, None
+                  value = -value
+                  full_window = alpha < value < beta
+
+             if full_window:
+                  value, _ = negamax(board, depth - 1, -beta, -alpha, -color, clock, move_pv)
+
+                  # --- Handle Time Termination ---
+                  if value is None and _ is None:
+                       board.pop() # Unmake before returning on time out
+                       return None, None
+                  value = -value # Negate value
+                  # --- End Time Termination Handling ---
 
 
         board.pop() # Unmake the move
-        move_sequence.pop() # Unmake the move from the sequence
 
         # --- Update best value and best move ---
         if value > best_value:
             best_value = value
             best_move = move
+            if value > alpha:
+                # The PV of this node is the move followed by the PV of the child
+                row = pv_table[ply]
+                length = pv_length[ply + 1]
+                row[ply] = move
+                row[ply + 1:length] = pv_table[ply + 1][ply + 1:length]
+                pv_length[ply] = length
 
         # --- Alpha-Beta Pruning ---
         alpha = max(alpha, best_value)
@@ -458,56 +654,47 @@ def negamax(board, depth, alpha, beta, color, start_time, stop_time, principal_v
         # The update logic is the same as before.
         if value >= beta:
             # This move caused a beta cutoff. Update Killer and History.
-            if not board.is_capture(move):
-                 # Update Killer Moves (using 'depth' of the current node)
-                 if 0 <= depth < MAX_SEARCH_DEPTH:
-                     if move not in killer_moves[depth]:
-                         killer_moves[depth].insert(0, move)
-                         if len(killer_moves[depth]) > KILLER_MOVES_COUNT:
-                             killer_moves[depth].pop()
+            move_ordering_stats["cut_nodes"] += 1
+            move_ordering_stats["moves_searched"] += move_index + 1
+            if move_index == 0:
+                move_ordering_stats["first_move_cuts"] += 1
+            if is_quiet:
+                 # Killer for this ply, counter-move of the opponent's previous move and history
+                 heuristics.update(board, ply, depth, move)
 
-                 # Update History Heuristic (using the move's squares)
-                 history_table[move.from_square][move.to_square] += depth # Or another scoring method
+            break # Beta cutoff
 
+    if move_index < 0:
+        # No legal move: checkmate (the worst possible outcome) or stalemate
+        return (ply - MATE if board.is_check() else 0), None
 
-            break # Beta cutoff
     # --- Transposition Table Store ---
-    if time.time() - start_time <= stop_time: # Check time again before storing
+    if not clock.stopped: # Check time again before storing
         flag = TT_EXACT
         if best_value <= original_alpha: # Failed low (didn't improve alpha)
             flag = TT_UPPERBOUND
         elif best_value >= beta: # Failed high (caused beta cutoff)
             flag = TT_LOWERBOUND
 
-        # Ensure we store meaningful values, especially for mates
-        # If best_value indicates a mate found at this depth, adjust score relative to ply
-        # (This helps prioritize faster mates, but is complex. Let's stick to INF for now)
-        # If best_value is -INF, it means we are getting mated.
-
-        transposition_table[board_hash] = {
-            'value': best_value,
-            'depth': depth,
-            'flag': flag,
-            'best_move': best_move
-        }
+        # Mate scores are stored relative to this position, so they stay valid at any ply
+        transposition_table.store(board_hash, depth, flag, score_to_tt(best_value, ply), best_move or 0)
 
 
     return best_value, best_move
 
-def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
+def clear_search_tables():
+    """Forgets what earlier searches learned: transposition table, killer moves and history."""
+    transposition_table.clear()
+    heuristics.clear()
+
+def probe_book_and_tablebase(board):
     """
-    Finds the best move using iterative deepening with a time limit,
-    transposition table, opening book, and aspiration windows.
+    Returns a move from the opening book or, with few pieces left, from the
+    Syzygy tablebase. Returns None when the position has to be searched.
     """
     # --- Opening Book Lookup ---
-    global current_best_move, search_value, cnt, max_depth_current
     global opening_book, syzygy_tablebase
 
-    current_best_move = None
-    search_value = None
-    cnt = 0
-    max_depth_current = 0
-
     if opening_book:
         try:
             book_move_entry = opening_book.weighted_choice(board)
@@ -553,7 +740,8 @@ def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
                         best_move_so_far = move
                 board.pop()
             print(f"Best move from tablebase: {best_move_so_far}, DTZ: {best_dtz}")
-            return best_move_so_far
+            if best_move_so_far is not None:
+                return best_move_so_far
 
         except Exception as e:
             # Handle potential errors during tablebase probing
@@ -561,21 +749,43 @@ def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
             pass # Fall through to search
     elif not syzygy_tablebase:
         load_syzygy_tablebase(SYZYGY_PATH)
+    return None
 
-    start_time = time.time()
-    stop_time = start_time + stop_time
+def iterative_deepening(board, max_depth, start_time, stop_time, start_depth=1, soft_stop_time=None):
+    """
+    Iterative deepening with aspiration windows from start_depth up to max_depth,
+    until stop_time (absolute) or stop_search. With soft_stop_time, no new depth is
+    started past it, as adjusted by the TimeManager. Lazy SMP helpers start at
+    different depths. Returns (best_move, depth, value) of the deepest
+    completed iteration, with best_move None if none completed.
+    The search works on int moves; best_move is converted back to a chess.Move here.
+    """
+    global current_best_move, search_value, cnt, max_depth_current, root_ply
+
+    current_best_move = None
+    search_value = None
+    cnt = 0
+    max_depth_current = 0
+    search_info.update(depth=0, score=None, nodes=0, best_move=None, pv=[])
+    iteration_stats.clear()
+    move_ordering_stats.update(cut_nodes=0, moves_searched=0, first_move_cuts=0)
+    heuristics.new_search()
 
     best_move_so_far = None
+    completed_depth = 0
     # Store the score from the previous depth for aspiration windows
     previous_depth_score = 0  # Initialize to 0 or a reasonable default
     principal_variation = []
     color = 1 if board.turn == chess.WHITE else -1
+    search_board = BitboardBoard.from_board(board)
+    root_ply = len(search_board.move_stack)
+    clock = TimeManager(start_time, stop_time, soft_stop_time, stop_search)
 
-    for depth in range(1, max_depth + 1):
+    for depth in range(start_depth, max_depth + 1):
         cnt = 0
         max_depth_current = depth
-        # Check if time is running out before starting a new depth
-        if time.time() > stop_time:
+        # Check if time is running out (or the search was cancelled) before starting a new depth
+        if stop_search.is_set() or time.time() > stop_time:
             print("Time limit reached at depth {depth - 1}.")
             break
 
@@ -584,7 +794,7 @@ def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
         # The window is used from depth 2 onwards
         current_alpha = -INF
         current_beta = INF
-        if depth > 1:
+        if depth > start_depth and abs(previous_depth_score) < MATE_BOUND:
             # Set the initial narrow window around the previous depth's score
             current_alpha = previous_depth_score - ASPIRATION_WINDOW_DELTA
             current_beta = previous_depth_score + ASPIRATION_WINDOW_DELTA
@@ -593,31 +803,35 @@ def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
             current_alpha = max(current_alpha, -INF)
             current_beta = min(current_beta, INF)
 
-        # Loop for potential re-searches
-        for asp_window_level in ASPIRATION_WINDOW_DELTA_AFTER:
-            time_left = stop_time - (time.time() - start_time)
+        # Loop for potential re-searches: after the windows of ASPIRATION_WINDOW_DELTA_AFTER
+        # have failed, the last search is made with the full window
+        for asp_window_level in ASPIRATION_WINDOW_DELTA_AFTER + [INF]:
             # Perform a depth-limited search with the current alpha-beta window
-            search_value, current_best_move = negamax(board.copy(), depth, current_alpha, current_beta, color, start_time, stop_time,
+            search_value, current_best_move = negamax(search_board, depth, current_alpha, current_beta, color, clock,
                                                       principal_variation)
 
             # Check for timeout during the search
-            if time.time() > stop_time or search_value is None:
+            if search_value is None:
                 print(f"Depth {depth} search timed out.")
                 # If a move was found in a previous, completed depth, return it.
                 # Otherwise, the function will return None and the fallback handles it.
                 break  # Exit the while True loop and the for loop
 
             # --- Aspiration Window Re-search Logic ---
-            if search_value < current_alpha:
+            if search_value <= current_alpha:
                 # Fail low: The true value is <= the lower bound of the window.
                 # The window was too high. Re-search with a wider window
+                if abs(search_value) >= MATE_BOUND:
+                    asp_window_level = INF # Mate scores are not searched with narrow windows
                 current_beta = search_value + asp_window_level
                 current_alpha = search_value - asp_window_level
                 cnt = 0
                 # The next iteration of the while loop will perform the re-search
-            elif search_value > current_beta:
+            elif search_value >= current_beta:
                 # Fail high: The true value is >= the upper bound of the window.
                 # The window was too low. Re-search with a wider window
+                if abs(search_value) >= MATE_BOUND:
+                    asp_window_level = INF # Mate scores are not searched with narrow windows
                 current_beta = search_value + asp_window_level
                 current_alpha = search_value - asp_window_level
                 cnt = 0
@@ -630,17 +844,67 @@ def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
 
         # If the search for this depth completed within the time limit (checked above)
         # and the search was successful (not timed out)
-        if time.time() - start_time <= stop_time and current_best_move is not None:
+        if current_best_move is not None:
             best_move_so_far = current_best_move
             previous_depth_score = search_value  # Store the value for the next iteration's window
-            if best_move_so_far:
-                principal_variation = [best_move_so_far]  # Update PV for move ordering
-
-            print(f"Depth {depth} completed. Best move: {best_move_so_far}, Value: {search_value}")
+            # Full PV for move ordering at every ply of the next iteration
+            principal_variation = pv_table[0][:pv_length[0]]
+            if not principal_variation or principal_variation[0] != best_move_so_far:
+                principal_variation = [best_move_so_far] # Root result from the transposition table
+            pv_moves = [search_board.chess_move(move) for move in principal_variation]
+            completed_depth = depth
+            search_info.update(depth=depth, score=search_value, best_move=pv_moves[0], pv=pv_moves)
+            iteration_stats.append((depth, search_info["nodes"], time.time() - start_time))
+
+            print(f"Depth {depth} completed. Best move: {search_board.uci(best_move_so_far)}, Value: {search_value}, "
+                  f"PV: {' '.join(move.uci() for move in pv_moves)}")
+            if depth < max_depth and not clock.iteration_done(best_move_so_far, search_value):
+                print(f"Soft time limit reached after depth {depth}.")
+                break
         else:
             # If the search timed out or no move was found, break the main loop
             break
 
+    if best_move_so_far is not None:
+        best_move_so_far = search_board.chess_move(best_move_so_far)
+    return best_move_so_far, completed_depth, previous_depth_score
+
+def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time, smp=None, time_left=None, increment=0):
+    """
+    Finds the best move using iterative deepening with a time limit,
+    transposition table, opening book, and aspiration windows.
+    With smp (a lazy_smp.LazySMP), the search runs on all of its processes.
+    With time_left (seconds on the engine's clock) and increment, soft and hard limits
+    are allocated from the clock; stop_time (seconds) then only caps the hard limit.
+    """
+    start_time = time.time() # Book and tablebase probes count towards the time of the move
+    best_move_so_far = probe_book_and_tablebase(board)
+    if best_move_so_far is not None:
+        return best_move_so_far
+
+    soft_stop_time = None
+    if time_left is not None:
+        soft_limit, hard_limit = allocate_time(time_left, increment)
+        soft_stop_time = start_time + soft_limit
+        stop_time = min(stop_time, hard_limit)
+    stop_time = start_time + stop_time
+    transposition_table.new_search() # Age entries from earlier moves of the game
+    evaluation_advanced.reset_cache_stats()
+
+    if smp is not None:
+        best_move_so_far, _, _ = smp.search(board, max_depth, start_time, stop_time, soft_stop_time)
+    else:
+        best_move_so_far, _, _ = iterative_deepening(board, max_depth, start_time, stop_time, soft_stop_time=soft_stop_time)
+
+    cache_stats = evaluation_advanced.cache_stats()
+    print(f"Eval cache: {cache_stats['eval_hits']} hits / {cache_stats['eval_misses']} misses, "
+          f"pawn cache: {cache_stats['pawn_hits']} hits / {cache_stats['pawn_misses']} misses")
+    print(f"Transposition table: {transposition_table.hashfull()} permille written by this search")
+    cut_nodes = move_ordering_stats["cut_nodes"]
+    if cut_nodes:
+        print(f"Move ordering: {move_ordering_stats['moves_searched'] / cut_nodes:.2f} moves per cut node, "
+              f"{100 * move_ordering_stats['first_move_cuts'] / cut_nodes:.1f}% cutoffs on the first move")
+
     # If no move was found (e.g., very short time limit and no book move),
     # fall back to a legal move.
     if best_move_so_far is None and board.legal_moves:
@@ -650,6 +914,25 @@ def find_best_move_iterative_deepening_tt_book_aw(board, max_depth, stop_time):
     return best_move_so_far
 
 
+def get_ponder_move(board, best_move):
+    """
+    Predicts the opponent's reply to best_move: the second move of the PV of the
+    last search or, if that PV does not start with best_move, the hash move stored
+    in the transposition table for the position after it.
+    Returns None if neither gives a legal move for that position.
+    """
+    if best_move is None:
+        return None
+    board = board.copy()
+    board.push(best_move)
+    pv = search_info["pv"]
+    if len(pv) >= 2 and pv[0] == best_move and board.is_legal(pv[1]):
+        return pv[1]
+    ponder_move = decode_move(transposition_table.get_stored_move(chess.polyglot.zobrist_hash(board)))
+    if ponder_move is not None and board.is_legal(ponder_move):
+        return ponder_move
+    return None
+
 def game_end(board):
     if board.is_checkmate():
         print(1)
@@ -673,8 +956,11 @@ def calculate_elo_change(rating_a, rating_b, result):
     return change
 
 
-async def play_match(num_games=10, your_elo=2200, stockfish_elo=2400):
-    """Play a match between your engine and Stockfish with specified Elo settings"""
+def play_match(num_games=10, your_elo=2200, stockfish_elo=2400):
+    """
+    Play a match between your engine and Stockfish with specified Elo settings, one game after another.
+    match_runner.run_match plays the games in parallel, with time controls and PGN output.
+    """
     if not os.path.exists(STOCKFISH_PATH):
         print(f"Error: Stockfish executable not found at '{STOCKFISH_PATH}'")
         print("Please download Stockfish and update the STOCKFISH_PATH variable.")
@@ -773,14 +1059,14 @@ async def play_match(num_games=10, your_elo=2200, stockfish_elo=2400):
             print("Engine shut down.")
 # Example usage:
 # Assuming 'initial_board' is a chess.Board object
-async def main():
+def main():
     if not os.path.exists(STOCKFISH_PATH):
         print(f"Error: Stockfish executable not found at '{STOCKFISH_PATH}'")
         print("Please download Stockfish and update the STOCKFISH_PATH variable.")
         exit()
 
         # Play ??? games against Stockfish with Elo 2200, starting from 1200
-    await play_match(num_games=10, your_elo=2200, stockfish_elo=2400)
+    play_match(num_games=10, your_elo=2200, stockfish_elo=2400)
 
 
 if __name__ == "__main__":
@@ -788,4 +1074,4 @@ if __name__ == "__main__":
         load_opening_book(OPENING_BOOK_PATH)  # Load the opening book if function exists
     if 'load_syzygy_tablebase' in globals():
         load_syzygy_tablebase(SYZYGY_PATH)
-    asyncio.run(main())
+    main()
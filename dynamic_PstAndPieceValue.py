@@ -176,4 +176,59 @@ def get_pst(piece_type, square, game_phase, is_white):
     endgame_value = endgame_pst[square]
     #print(f"Piece: {piece_type}, Square: {square}, Score: {opening_pst[square]}")
 
-    return opening_value * game_phase + endgame_value * (1 - game_phase)
\ No newline at end of file
+    return opening_value * game_phase + endgame_value * (1 - game_phase)
+
+
+# Bảng tính sẵn: MG_TABLE[color][piece_type][square] = giá trị vật chất + PST khai cuộc,
+# EG_TABLE tương tự cho tàn cuộc. Ô đã được lật sẵn cho quân Trắng.
+MG_TABLE = [[[0] * 64 for _ in range(7)] for _ in chess.COLORS]
+EG_TABLE = [[[0] * 64 for _ in range(7)] for _ in chess.COLORS]
+for _color in chess.COLORS:
+    for _piece_type in chess.PIECE_TYPES:
+        for _square in chess.SQUARES:
+            _pst_square = _square ^ 56 if _color == chess.WHITE else _square
+            MG_TABLE[_color][_piece_type][_square] = (PIECE_VALUES[_piece_type]['opening']
+                                                      + PST[_piece_type]['opening'][_pst_square])
+            EG_TABLE[_color][_piece_type][_square] = (PIECE_VALUES[_piece_type]['endgame']
+                                                      + PST[_piece_type]['endgame'][_pst_square])
+
+# Giá trị khai cuộc của từng quân dùng để tính giai đoạn ván cờ (Vua = 0)
+PHASE_VALUES = [0] + [PIECE_VALUES[piece_type]['opening'] for piece_type in chess.PIECE_TYPES]
+# Mẫu số chuẩn hóa giai đoạn: toàn bộ quân (trừ Vua) của thế cờ ban đầu
+PHASE_TOTAL = (16 * PHASE_VALUES[chess.PAWN] + 4 * PHASE_VALUES[chess.KNIGHT] + 4 * PHASE_VALUES[chess.BISHOP]
+               + 4 * PHASE_VALUES[chess.ROOK] + 2 * PHASE_VALUES[chess.QUEEN])
+
+
+def material_pst_scores(board):
+    """
+    Cộng vật chất + PST một lần cho mọi quân cờ.
+    Trả về (mg, eg, phase_material): mg/eg là điểm khai cuộc/tàn cuộc (Trắng trừ Đen),
+    phase_material là tổng giá trị khai cuộc của các quân dùng cho game_phase.
+    """
+    mg = 0
+    eg = 0
+    phase_material = 0
+    for color in chess.COLORS:
+        sign = 1 if color == chess.WHITE else -1
+        occupied = board.occupied_co[color]
+        for piece_type in chess.PIECE_TYPES:
+            mask = board.pieces_mask(piece_type, color)
+            if not mask:
+                continue
+            mg_table = MG_TABLE[color][piece_type]
+            eg_table = EG_TABLE[color][piece_type]
+            for square in chess.scan_forward(mask):
+                mg += sign * mg_table[square]
+                eg += sign * eg_table[square]
+            phase_material += PHASE_VALUES[piece_type] * chess.popcount(mask)
+    return mg, eg, phase_material
+
+
+def game_phase_from_material(phase_material):
+    """game_phase: 1.0 (khai cuộc) -> 0.0 (tàn cuộc)."""
+    return min(1.0, phase_material / PHASE_TOTAL)
+
+
+def tapered_score(mg, eg, game_phase):
+    """Nội suy điểm khai cuộc/tàn cuộc theo giai đoạn ván cờ."""
+    return mg * game_phase + eg * (1 - game_phase)
@@ -1,152 +1,194 @@
 import time
+from array import array
+from collections import namedtuple
+
 import chess
 import chess.polyglot
 
+from bitboard_board import BitboardBoard
 from constant import CENTER_SQUARES, EXTENDED_CENTER, FORK_BONUS, FORK_CHECK_BONUS, PIN_ABSOLUTE_BONUS
-from dynamic_PstAndPieceValue import get_piece_value, get_pst
+from dynamic_PstAndPieceValue import game_phase_from_material, material_pst_scores, tapered_score
+from search_board import SearchBoard, pawn_zobrist_hash
 
 # Precomputed king attack bitboards
 BB_KING_ATTACKS = {s: chess.BB_KING_ATTACKS[s] for s in chess.SQUARES}
 
-zobrist_key = None
+# Use integer bitboard operations for the loop-heavy terms instead of per-square loops
+USE_BITBOARD_EVAL = True
 
-# Cache dictionaries
-attack_cache = {}
-attackers_cache = {}
-pin_cache = {}
-open_files_cache = {}
-semi_open_files_cache = {}
-piece_map_cache = {}
+# Score of a checkmated position. Evaluations are whole centipawns, far below it
+MATE_SCORE = 32000
 
-def piece_count(board):
-    """Get piece count for each color, cached."""
-    cache_key = zobrist_key
-    if cache_key not in piece_map_cache:
-        piece_map_cache[cache_key] = board.piece_map()
-    piece_map = piece_map_cache[cache_key]
-    piece_count = sum(1 for square, piece in piece_map.items())
-    return piece_count
+# Precomputed masks for the bitboard evaluation
+BB_CENTER = 0
+for _square in CENTER_SQUARES:
+    BB_CENTER |= chess.BB_SQUARES[_square]
+BB_ADJACENT_FILES = [
+    (chess.BB_FILES[file - 1] if file > 0 else 0) | (chess.BB_FILES[file + 1] if file < 7 else 0)
+    for file in range(8)
+]
+# BB_PASSED_SPAN[color][square]: squares ahead of a pawn on its own and adjacent files
+BB_PASSED_SPAN = [[0] * 64, [0] * 64]
+for _square in chess.SQUARES:
+    _file, _rank = chess.square_file(_square), chess.square_rank(_square)
+    _files = chess.BB_FILES[_file] | BB_ADJACENT_FILES[_file]
+    for _r in range(8):
+        if _r > _rank:
+            BB_PASSED_SPAN[chess.WHITE][_square] |= _files & chess.BB_RANKS[_r]
+        elif _r < _rank:
+            BB_PASSED_SPAN[chess.BLACK][_square] |= _files & chess.BB_RANKS[_r]
+BB_WHITE_SPACE = chess.BB_RANK_4 | chess.BB_RANK_5 | chess.BB_RANK_6 | chess.BB_RANK_7 | chess.BB_RANK_8
+BB_BLACK_SPACE = chess.BB_RANK_1 | chess.BB_RANK_2 | chess.BB_RANK_3 | chess.BB_RANK_4 | chess.BB_RANK_5
+BB_WHITE_OUTPOST_RANKS = chess.BB_RANK_4 | chess.BB_RANK_5 | chess.BB_RANK_6
+BB_BLACK_OUTPOST_RANKS = chess.BB_RANK_3 | chess.BB_RANK_4 | chess.BB_RANK_5
 
-def get_attacks(board, square):
-    """Get attack squares for a piece, cached."""
-    cache_key = (zobrist_key, square)
-    if cache_key not in attack_cache:
-        attack_cache[cache_key] = board.attacks(square)
-    return attack_cache[cache_key]
+THREAT_VALUES = [0, 6, 12, 12, 20, 30, 0] # Indexed by piece type
 
-def get_attackers(board, square, color):
-    """Get attackers of a square for a color, cached."""
-    cache_key = (zobrist_key, square, color)
-    if cache_key not in attackers_cache:
-        attackers_cache[cache_key] = board.attackers(color, square)
-    return attackers_cache[cache_key]
+EVAL_CACHE_SIZE = 1 << 18 # Number of cached evaluations (must be a power of two)
+PAWN_CACHE_SIZE = 1 << 14 # Number of cached pawn structures (must be a power of two)
 
-def is_pinned(board, color, square):
-    """Check if a piece is pinned, cached."""
-    cache_key = (zobrist_key, color, square)
-    if cache_key not in pin_cache:
-        pin_cache[cache_key] = board.is_pinned(color, square)
-    return pin_cache[cache_key]
-
-def get_open_files(board, white_pawns, black_pawns):
-    """Get open files (no pawns), cached."""
-    cache_key = zobrist_key
-    if cache_key not in open_files_cache:
-        pawn_bitboard = (white_pawns | black_pawns).mask
-        open_files_cache[cache_key] = [
-            f for f in range(8) if not (chess.BB_FILES[f] & pawn_bitboard)
-        ]
-    return open_files_cache[cache_key]
-
-def get_semi_open_files(board, white_pawns, black_pawns):
-    """Get semi-open files (pawns of one side only), cached."""
-    cache_key = zobrist_key
-    if cache_key not in semi_open_files_cache:
-        white_pawn_files = set(chess.square_file(p) for p in white_pawns)
-        black_pawn_files = set(chess.square_file(p) for p in black_pawns)
-        semi_open_files_cache[cache_key] = {
-            'white': [f for f in range(8) if f not in black_pawn_files and f in white_pawn_files],
-            'black': [f for f in range(8) if f not in white_pawn_files and f in black_pawn_files]
-        }
-    return semi_open_files_cache[cache_key]
 
-def get_piece_map(board):
-    """Get piece map, cached."""
-    cache_key = zobrist_key
-    if cache_key not in piece_map_cache:
-        piece_map_cache[cache_key] = board.piece_map()
-    return piece_map_cache[cache_key]
+class EvalCache:
+    """
+    Bounded hash of Zobrist key -> final evaluation. Entries live in two-slot
+    clusters; slot 0 always holds the most recently used entry, so a new entry
+    evicts the least recently used one in its cluster.
+    """
 
-def get_game_phase(board):
-    piece_map = get_piece_map(board)
-    material = [0, 0]
-    for square, piece in piece_map.items():
-        material[piece.color] += get_piece_value(piece.piece_type, 1.0)
-    total_material = sum(material) - get_piece_value(chess.KING, 1.0) * 2
-    return min(1.0, total_material / (
-        16 * get_piece_value(chess.PAWN, 1.0) +
-        4 * get_piece_value(chess.KNIGHT, 1.0) +
-        4 * get_piece_value(chess.BISHOP, 1.0) +
-        4 * get_piece_value(chess.ROOK, 1.0) +
-        2 * get_piece_value(chess.QUEEN, 1.0)
-    ))
+    def __init__(self, size=EVAL_CACHE_SIZE):
+        self.mask = size // 2 - 1
+        self.keys = array('Q', bytes(8 * size))
+        self.scores = array('q', bytes(8 * size))
+        self.hits = 0
+        self.misses = 0
 
+    def probe(self, key):
+        index = (key & self.mask) << 1
+        keys = self.keys
+        if keys[index] == key:
+            self.hits += 1
+            return self.scores[index]
+        if keys[index + 1] == key:
+            scores = self.scores
+            keys[index], keys[index + 1] = key, keys[index]
+            scores[index], scores[index + 1] = scores[index + 1], scores[index]
+            self.hits += 1
+            return scores[index]
+        self.misses += 1
+        return None
 
-def evaluate(board):
-    global zobrist_key
-    """Evaluate the board position, returning a score (positive favors White)."""
-    zobrist_key = chess.polyglot.zobrist_hash(board)
-    # Clear caches to prevent memory leaks
-    attack_cache.clear()
-    attackers_cache.clear()
-    pin_cache.clear()
-    open_files_cache.clear()
-    semi_open_files_cache.clear()
-    piece_map_cache.clear()
+    def store(self, key, score):
+        index = (key & self.mask) << 1
+        keys = self.keys
+        scores = self.scores
+        keys[index + 1] = keys[index]
+        scores[index + 1] = scores[index]
+        keys[index] = key
+        scores[index] = score
 
-    # Check game end conditions
-    if board.is_checkmate():
-        return -9999 if board.turn == chess.WHITE else 9999
-    if board.is_stalemate() or board.is_insufficient_material() or board.is_seventyfive_moves():
-        return 0
+    def clear(self):
+        self.keys = array('Q', bytes(8 * len(self.keys)))
+        self.scores = array('q', bytes(8 * len(self.scores)))
+        self.hits = 0
+        self.misses = 0
 
-    total_score = 0
-    material = [0, 0]
-    piece_map = get_piece_map(board)
-    for square, piece in piece_map.items():
-        material[piece.color] += get_piece_value(piece.piece_type, 1.0)
-    total_material = sum(material) - get_piece_value(chess.KING, 1.0) * 2
-    game_phase = min(1.0, total_material / (
-        16 * get_piece_value(chess.PAWN, 1.0) +
-        4 * get_piece_value(chess.KNIGHT, 1.0) +
-        4 * get_piece_value(chess.BISHOP, 1.0) +
-        4 * get_piece_value(chess.ROOK, 1.0) +
-        2 * get_piece_value(chess.QUEEN, 1.0)
-    ))
-
-    # Material
-    material = [0, 0]
-    for square, piece in piece_map.items():
-        material[piece.color] += get_piece_value(piece.piece_type, game_phase)
 
-    total_score += material[chess.WHITE] - material[chess.BLACK]
+# Cached pawn-structure terms. mg is used while game_phase >= 0.2 and eg below it.
+# The file masks have bit f set for file f; the passed pawns are square bitboards.
+PawnEntry = namedtuple('PawnEntry', [
+    'key', 'mg', 'eg', 'open_files', 'white_semi_open_files', 'black_semi_open_files',
+    'white_passed', 'black_passed',
+])
 
-    # Piece-Square Tables
-    position_score = 0
-    for square, piece in piece_map.items():
-        score = get_pst(piece.piece_type, square, game_phase, piece.color == chess.WHITE)
-        #print(square, end=" ")
-        #print(piece, end=" ")
-        #print(score)
-        position_score += score if piece.color == chess.WHITE else -score
-    #print(total_score)
-    total_score += position_score
-    #print(total_score)
 
-    # Pawn Structure
+class PawnHashTable:
+    """Direct-mapped, always-replace table of PawnEntry keyed by the pawn-only Zobrist key."""
+
+    def __init__(self, size=PAWN_CACHE_SIZE):
+        self.mask = size - 1
+        self.entries = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, pawn_key):
+        entry = self.entries[pawn_key & self.mask]
+        if entry is not None and entry.key == pawn_key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, entry):
+        self.entries[entry.key & self.mask] = entry
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+        self.hits = 0
+        self.misses = 0
+
+
+eval_cache = EvalCache()
+pawn_cache = PawnHashTable()
+
+
+def cache_stats():
+    """Hit/miss counters of the evaluation and pawn caches since the last reset."""
+    return {
+        'eval_hits': eval_cache.hits,
+        'eval_misses': eval_cache.misses,
+        'pawn_hits': pawn_cache.hits,
+        'pawn_misses': pawn_cache.misses,
+    }
+
+
+def reset_cache_stats():
+    eval_cache.hits = eval_cache.misses = 0
+    pawn_cache.hits = pawn_cache.misses = 0
+
+
+def piece_count(board):
+    """Get piece count for both colors."""
+    return chess.popcount(board.occupied)
+
+def get_attacks(board, square):
+    """Get attack squares for a piece."""
+    return board.attacks(square)
+
+def get_attackers(board, square, color):
+    """Get attackers of a square for a color."""
+    return board.attackers(color, square)
+
+def is_pinned(board, color, square):
+    """Check if a piece is pinned."""
+    return board.is_pinned(color, square)
+
+def get_piece_map(board):
+    """Get piece map."""
+    return board.piece_map()
+
+def get_pawn_structure(board, white_pawns, black_pawns):
+    """Pawn structure terms, file masks and passed pawns for the position, via the pawn hash."""
+    # SearchBoard and BitboardBoard keep the pawn key up to date incrementally
+    pawn_key = getattr(board, 'pawn_key', None)
+    if pawn_key is None:
+        pawn_key = pawn_zobrist_hash(board)
+    entry = pawn_cache.probe(pawn_key)
+    if entry is not None:
+        return entry
+
+    if USE_BITBOARD_EVAL:
+        entry = PawnEntry(pawn_key, *pawn_terms_bitboard(white_pawns.mask, black_pawns.mask))
+    else:
+        entry = PawnEntry(pawn_key, *pawn_terms_legacy(white_pawns, black_pawns))
+    pawn_cache.store(entry)
+    return entry
+
+def pawn_terms_legacy(white_pawns, black_pawns):
+    """Pawn structure terms computed with per-pawn loops. Returns the PawnEntry fields after the key."""
     pawn_structure_score = 0
-    white_pawns = board.pieces(chess.PAWN, chess.WHITE)
-    black_pawns = board.pieces(chess.PAWN, chess.BLACK)
+    endgame_score = 0
+    white_passed = 0
+    black_passed = 0
     for pawn in white_pawns:
         file, rank = chess.square_file(pawn), chess.square_rank(pawn)
         is_passed = not any(
@@ -154,10 +196,12 @@ def evaluate(board):
             for p in black_pawns
         )
         if is_passed:
-            bonus = 40 + 15 * rank
-            if game_phase < 0.2 and rank >= 5:
-                bonus += 100
-            pawn_structure_score += bonus
+            white_passed |= chess.BB_SQUARES[pawn]
+            pawn_structure_score += 40 + 15 * rank
+            if rank >= 5:
+                endgame_score += 100
+        if rank >= 6:
+            endgame_score += 100
     for pawn in black_pawns:
         file, rank = chess.square_file(pawn), chess.square_rank(pawn)
         is_passed = not any(
@@ -165,10 +209,16 @@ def evaluate(board):
             for p in white_pawns
         )
         if is_passed:
-            bonus = 40 + 15 * (7 - rank)
-            if game_phase < 0.2 and rank <= 2:
-                bonus += 100
-            pawn_structure_score -= bonus
+            black_passed |= chess.BB_SQUARES[pawn]
+            pawn_structure_score -= 40 + 15 * (7 - rank)
+            if rank <= 2:
+                endgame_score -= 100
+        if rank <= 1:
+            endgame_score -= 100
+
+    open_files = 0
+    white_semi_open_files = 0
+    black_semi_open_files = 0
     for file in range(8):
         white_pawns_in_file = len([p for p in white_pawns if chess.square_file(p) == file])
         black_pawns_in_file = len([p for p in black_pawns if chess.square_file(p) == file])
@@ -176,8 +226,157 @@ def evaluate(board):
             pawn_structure_score -= 15 * (white_pawns_in_file - 1)
         if black_pawns_in_file > 1:
             pawn_structure_score -= 15 * (black_pawns_in_file - 1)
+        if not white_pawns_in_file and not black_pawns_in_file:
+            open_files |= 1 << file
+        elif not black_pawns_in_file:
+            white_semi_open_files |= 1 << file
+        elif not white_pawns_in_file:
+            black_semi_open_files |= 1 << file
+
+    return (pawn_structure_score, pawn_structure_score + endgame_score, open_files,
+            white_semi_open_files, black_semi_open_files, white_passed, black_passed)
+
+def pawn_terms_bitboard(white_pawns, black_pawns):
+    """Same as pawn_terms_legacy, computed from the pawn bitboards (ints) with precomputed masks."""
+    pawn_structure_score = 0
+    endgame_score = 0
+    white_passed = 0
+    black_passed = 0
+    for pawn in chess.scan_forward(white_pawns):
+        rank = pawn >> 3
+        if not BB_PASSED_SPAN[chess.WHITE][pawn] & black_pawns:
+            white_passed |= chess.BB_SQUARES[pawn]
+            pawn_structure_score += 40 + 15 * rank
+            if rank >= 5:
+                endgame_score += 100
+    for pawn in chess.scan_forward(black_pawns):
+        rank = pawn >> 3
+        if not BB_PASSED_SPAN[chess.BLACK][pawn] & white_pawns:
+            black_passed |= chess.BB_SQUARES[pawn]
+            pawn_structure_score -= 40 + 15 * (7 - rank)
+            if rank <= 2:
+                endgame_score -= 100
+    endgame_score += 100 * (chess.popcount(white_pawns & (chess.BB_RANK_7 | chess.BB_RANK_8))
+                            - chess.popcount(black_pawns & (chess.BB_RANK_1 | chess.BB_RANK_2)))
+
+    open_files = 0
+    white_semi_open_files = 0
+    black_semi_open_files = 0
+    for file in range(8):
+        file_mask = chess.BB_FILES[file]
+        white_pawns_in_file = chess.popcount(white_pawns & file_mask)
+        black_pawns_in_file = chess.popcount(black_pawns & file_mask)
+        if white_pawns_in_file > 1:
+            pawn_structure_score -= 15 * (white_pawns_in_file - 1)
+        if black_pawns_in_file > 1:
+            pawn_structure_score -= 15 * (black_pawns_in_file - 1)
+        if not white_pawns_in_file and not black_pawns_in_file:
+            open_files |= 1 << file
+        elif not black_pawns_in_file:
+            white_semi_open_files |= 1 << file
+        elif not white_pawns_in_file:
+            black_semi_open_files |= 1 << file
+
+    return (pawn_structure_score, pawn_structure_score + endgame_score, open_files,
+            white_semi_open_files, black_semi_open_files, white_passed, black_passed)
+
+def pinned_mask(board, color):
+    """Bitboard of the pieces of color that are absolutely pinned to their king."""
+    king = board.king(color)
+    if king is None:
+        return 0
+    sliders = ((chess.BB_RANK_ATTACKS[king][0] | chess.BB_FILE_ATTACKS[king][0]) & (board.rooks | board.queens)
+               | chess.BB_DIAG_ATTACKS[king][0] & (board.bishops | board.queens))
+    pinned = 0
+    for sniper in chess.scan_reversed(sliders & board.occupied_co[not color]):
+        blockers = chess.between(king, sniper) & board.occupied
+        if blockers and not blockers & (blockers - 1):
+            pinned |= blockers
+    return pinned & board.occupied_co[color]
+
+def get_game_phase(board):
+    return game_phase_from_material(material_pst_scores(board)[2])
+
+
+def evaluate(board):
+    """
+    Evaluate the board position, returning a score (positive favors White).
+    Results for the search boards are kept in eval_cache across calls, keyed by the
+    Zobrist key they maintain incrementally. Other boards are scored from scratch
+    with the game-end checks, which the search makes itself (see evaluate_position).
+    """
+    if not isinstance(board, (SearchBoard, BitboardBoard)):
+        return evaluate_position(board)
+
+    zobrist_key = board.zobrist_key
+    score = eval_cache.probe(zobrist_key)
+    if score is None:
+        score = evaluate_position(board)
+        eval_cache.store(zobrist_key, score)
+    return score
+
+
+def evaluate_position(board):
+    """
+    Evaluate the board position from scratch, bypassing the evaluation cache. Returns integer centipawns.
+    Checkmate, stalemate and the 75-move rule need the legal moves, so they are only checked for
+    boards outside the search; the search finds them after its move loop and in quiescence search.
+    """
+    # Check game end conditions
+    if not isinstance(board, (SearchBoard, BitboardBoard)):
+        if board.is_checkmate():
+            return -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+        if board.is_stalemate() or board.is_seventyfive_moves():
+            return 0
+    if board.is_insufficient_material():
+        return 0
+
+    # Material and Piece-Square Tables, summed once into midgame/endgame totals
+    if isinstance(board, (SearchBoard, BitboardBoard)):
+        # Maintained incrementally by push/pop
+        mg_score, eg_score, phase_material = board.mg_score, board.eg_score, board.phase_material
+    else:
+        mg_score, eg_score, phase_material = material_pst_scores(board)
+    game_phase = game_phase_from_material(phase_material)
+    total_score = tapered_score(mg_score, eg_score, game_phase)
+
+    # Pawn Structure
+    white_pawns = board.pieces(chess.PAWN, chess.WHITE)
+    black_pawns = board.pieces(chess.PAWN, chess.BLACK)
+    pawn_entry = get_pawn_structure(board, white_pawns, black_pawns)
+    # The endgame component also carries the far-advanced pawn bonus of the endgame adjustments
+    pawn_structure_score = pawn_entry.eg if game_phase < 0.2 else pawn_entry.mg
     total_score += pawn_structure_score
-    #print(total_score)
+
+    # King Safety
+    king_safety_score = 0
+    white_king = board.king(chess.WHITE)
+    black_king = board.king(chess.BLACK)
+    white_king_zone = chess.SquareSet(BB_KING_ATTACKS[white_king] | chess.BB_SQUARES[white_king])
+    black_king_zone = chess.SquareSet(BB_KING_ATTACKS[black_king] | chess.BB_SQUARES[black_king])
+    white_pawn_shield = chess.popcount(white_pawns.mask & white_king_zone.mask)
+    black_pawn_shield = chess.popcount(black_pawns.mask & black_king_zone.mask)
+    king_safety_score += white_pawn_shield * 10 - black_pawn_shield * 10
+    white_king_file = chess.square_file(white_king)
+    black_king_file = chess.square_file(black_king)
+    if pawn_entry.black_semi_open_files & (1 << white_king_file):
+        king_safety_score -= 20
+    if pawn_entry.white_semi_open_files & (1 << black_king_file):
+        king_safety_score += 20
+    total_score += king_safety_score
+
+    if USE_BITBOARD_EVAL:
+        total_score += piece_terms_bitboard(board, pawn_entry, game_phase)
+    else:
+        total_score += piece_terms_legacy(board, white_pawns, black_pawns, pawn_entry, game_phase)
+
+    return round(total_score)
+
+def piece_terms_legacy(board, white_pawns, black_pawns, pawn_entry, game_phase):
+    """Mobility, space, outposts, coordination, threats and king activity with per-square loops."""
+    total_score = 0
+    piece_map = get_piece_map(board)
+
     # Combined Mobility, Center Control, and Space
     mobility_score = 0
     center_control_score = 0
@@ -249,24 +448,6 @@ def evaluate(board):
                 outpost_score += 20 if piece.color == chess.WHITE else -20
     total_score += outpost_score
 
-    # King Safety
-    king_safety_score = 0
-    white_king = board.king(chess.WHITE)
-    black_king = board.king(chess.BLACK)
-    white_king_zone = chess.SquareSet(BB_KING_ATTACKS[white_king] | chess.BB_SQUARES[white_king])
-    black_king_zone = chess.SquareSet(BB_KING_ATTACKS[black_king] | chess.BB_SQUARES[black_king])
-    white_pawn_shield = len([p for p in white_pawns if p in white_king_zone])
-    black_pawn_shield = len([p for p in black_pawns if p in black_king_zone])
-    king_safety_score += white_pawn_shield * 10 - black_pawn_shield * 10
-    semi_open_files = get_semi_open_files(board, white_pawns, black_pawns)
-    white_king_file = chess.square_file(white_king)
-    black_king_file = chess.square_file(black_king)
-    if white_king_file in semi_open_files['black']:
-        king_safety_score -= 20
-    if black_king_file in semi_open_files['white']:
-        king_safety_score += 20
-    total_score += king_safety_score
-
     # Piece Coordination
     coordination_score = 0
     white_bishops = len(board.pieces(chess.BISHOP, chess.WHITE))
@@ -275,7 +456,9 @@ def evaluate(board):
         coordination_score += 30
     if black_bishops == 2:
         coordination_score -= 30
-    for file in get_open_files(board, white_pawns, black_pawns):
+    for file in range(8):
+        if not pawn_entry.open_files & (1 << file):
+            continue
         file_squares = chess.SquareSet(chess.BB_FILES[file])
         white_rooks = len([r for r in board.pieces(chess.ROOK, chess.WHITE) if r in file_squares])
         white_queens = len([q for q in board.pieces(chess.QUEEN, chess.WHITE) if q in file_squares])
@@ -362,14 +545,107 @@ def evaluate(board):
         white_king_activity = len(get_attacks(board, white_king))
         black_king_activity = len(get_attacks(board, black_king))
         total_score += (white_king_activity - black_king_activity) * 8
-        for pawn in white_pawns:
-            rank = chess.square_rank(pawn)
-            if rank >= 6:
-                total_score += 100
-        for pawn in black_pawns:
-            rank = chess.square_rank(pawn)
-            if rank <= 1:
-                total_score -= 100
+        # Bonus for pawns close to promotion is part of the pawn hash endgame component
+
+    return total_score
+
+def piece_terms_bitboard(board, pawn_entry, game_phase):
+    """Same as piece_terms_legacy, computed with bitboard masks and popcounts."""
+    popcount = chess.popcount
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    white_pawns = board.pawns & white
+    black_pawns = board.pawns & black
+
+    # Combined Mobility, Center Control, and Space
+    white_mobility = 0
+    black_mobility = 0
+    white_attackers = 0
+    black_attackers = 0
+    pieces = board.knights | board.bishops | board.rooks | board.queens
+    for piece_square in chess.scan_forward(pieces & white):
+        attacks = board.attacks_mask(piece_square)
+        white_mobility += 0.5 * popcount(attacks)
+        white_attackers |= attacks
+    for piece_square in chess.scan_forward(pieces & black):
+        attacks = board.attacks_mask(piece_square)
+        black_mobility += 0.5 * popcount(attacks)
+        black_attackers |= attacks
+    center_control_score = (10 * (popcount(white_pawns & BB_CENTER) - popcount(black_pawns & BB_CENTER))
+                            + 3 * (popcount(white_attackers & BB_CENTER) - popcount(black_attackers & BB_CENTER)))
+    space_score = 2 * (popcount(white_attackers & ~black_attackers & BB_WHITE_SPACE)
+                       - popcount(black_attackers & ~white_attackers & BB_BLACK_SPACE))
+    mobility_weight = 3 * game_phase + 1.5 * (1 - game_phase)
+    mobility_score = (white_mobility - black_mobility) * mobility_weight
+    total_score = mobility_score + center_control_score + space_score
+
+    # Outposts
+    outpost_score = 0
+    minors = board.knights | board.bishops
+    for square in chess.scan_forward(minors & white & BB_WHITE_OUTPOST_RANKS):
+        if chess.BB_PAWN_ATTACKS[chess.BLACK][square] & white_pawns and not BB_PASSED_SPAN[chess.WHITE][square] & black_pawns:
+            outpost_score += 20
+    for square in chess.scan_forward(minors & black & BB_BLACK_OUTPOST_RANKS):
+        if chess.BB_PAWN_ATTACKS[chess.WHITE][square] & black_pawns and not BB_PASSED_SPAN[chess.BLACK][square] & white_pawns:
+            outpost_score -= 20
+    total_score += outpost_score
+
+    # Piece Coordination
+    coordination_score = 0
+    if popcount(board.bishops & white) == 2:
+        coordination_score += 30
+    if popcount(board.bishops & black) == 2:
+        coordination_score -= 30
+    for file in range(8):
+        if not pawn_entry.open_files & (1 << file):
+            continue
+        file_mask = chess.BB_FILES[file]
+        if board.rooks & white & file_mask and board.queens & white & file_mask:
+            coordination_score += 20
+        if board.rooks & black & file_mask and board.queens & black & file_mask:
+            coordination_score -= 20
+    total_score += coordination_score
+
+    # Rook on Seventh
+    total_score += (popcount(board.rooks & white & chess.BB_RANK_7) - popcount(board.rooks & black & chess.BB_RANK_2)) * 30
+
+    # Threats (Forks and Pins)
+    white_threats = 0
+    black_threats = 0
+    for square in chess.scan_forward(black):
+        attackers = popcount(board.attackers_mask(chess.WHITE, square))
+        if attackers and attackers > popcount(board.attackers_mask(chess.BLACK, square)):
+            white_threats += THREAT_VALUES[board.piece_type_at(square)]
+    for square in chess.scan_forward(white):
+        attackers = popcount(board.attackers_mask(chess.BLACK, square))
+        if attackers and attackers > popcount(board.attackers_mask(chess.WHITE, square)):
+            black_threats += THREAT_VALUES[board.piece_type_at(square)]
+    white_threats += PIN_ABSOLUTE_BONUS * popcount(pinned_mask(board, chess.BLACK))
+    black_threats += PIN_ABSOLUTE_BONUS * popcount(pinned_mask(board, chess.WHITE))
+
+    forkers = board.knights | board.queens
+    fork_targets = board.knights | board.bishops | board.rooks | board.queens
+    black_king_mask = board.kings & black
+    white_king_mask = board.kings & white
+    for piece_square in chess.scan_forward(forkers & white):
+        attacks = board.attacks_mask(piece_square)
+        king_attacked = attacks & black_king_mask
+        if popcount(attacks & fork_targets & black) + (1 if king_attacked else 0) >= 2:
+            # Adjusted bonus for forks involving the king
+            white_threats += 50 if king_attacked else FORK_BONUS
+    for piece_square in chess.scan_forward(forkers & black):
+        attacks = board.attacks_mask(piece_square)
+        king_attacked = attacks & white_king_mask
+        if popcount(attacks & fork_targets & white) + (1 if king_attacked else 0) >= 2:
+            black_threats += 50 if king_attacked else FORK_BONUS
+    threats_weight = 0.8 * game_phase + 0.45 * (1 - game_phase)
+    total_score += (white_threats - black_threats) * threats_weight
+
+    # Endgame Adjustments
+    if game_phase < 0.2:
+        white_king_activity = popcount(BB_KING_ATTACKS[board.king(chess.WHITE)])
+        black_king_activity = popcount(BB_KING_ATTACKS[board.king(chess.BLACK)])
+        total_score += (white_king_activity - black_king_activity) * 8
 
     return total_score
 
@@ -0,0 +1,117 @@
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+import chess
+
+import board_tree
+from transposition_table import TranspositionTable, table_bytes
+
+DEFAULT_THREADS = 1
+HELPER_START_DEPTHS = 3  # Helpers start at depths 2, 3, ... up to 1 + this, the main search at 1
+RESULT_POLL_SECONDS = 0.5  # Waits for helper results are split into slices this long to check the helpers
+
+# Same start method on every platform; helpers only need board_tree, not pygame
+_context = multiprocessing.get_context("spawn")
+
+
+def _helper_main(helper_id, shm_name, size_mb, requests, results, stop_event):
+    """Loop of a helper process: searches every position it receives into the shared table."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    board_tree.transposition_table = TranspositionTable(size_mb, buffer=shm.buf)
+    board_tree.stop_search = stop_event
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        root_fen, moves, max_depth, start_time, stop_time, generation = request
+        board = chess.Board(root_fen)
+        for move in moves:
+            board.push(move)
+        board_tree.transposition_table.generation = generation
+        # Helpers cycle through the start depths after the main search's, so that up to
+        # HELPER_START_DEPTHS helpers all search different iteration sequences
+        start_depth = min(2 + (helper_id - 1) % HELPER_START_DEPTHS, max_depth)
+        best_move, depth, value = board_tree.iterative_deepening(board, max_depth, start_time, stop_time, start_depth)
+        results.put((best_move, depth, value, board_tree.search_info["nodes"]))
+    board_tree.transposition_table = None  # Release the views before closing the segment
+    shm.close()
+
+
+class LazySMP:
+    """
+    Lazy SMP: the calling process and threads - 1 helper processes run the same
+    iterative deepening on the same position and share one transposition table
+    placed in shared memory. Nothing else is coordinated: helpers start at
+    staggered depths, pick up each other's results through the table, and the
+    deepest completed iteration of any process is played.
+
+    While it is open, board_tree.transposition_table is the shared table.
+    Pass the instance as smp to find_best_move_iterative_deepening_tt_book_aw.
+    """
+
+    def __init__(self, threads=DEFAULT_THREADS, size_mb=board_tree.TT_SIZE_MB):
+        self.threads = threads
+        self.shm = shared_memory.SharedMemory(create=True, size=table_bytes(size_mb))
+        self.previous_table = board_tree.transposition_table
+        board_tree.transposition_table = TranspositionTable(size_mb, buffer=self.shm.buf)
+        self.stop_event = _context.Event()
+        self.results = _context.Queue()
+        self.helpers = []
+        for helper_id in range(1, threads):
+            requests = _context.Queue()
+            process = _context.Process(target=_helper_main, daemon=True,
+                                       args=(helper_id, self.shm.name, size_mb, requests, self.results,
+                                             self.stop_event))
+            process.start()
+            self.helpers.append((process, requests))
+        self.nodes = 0
+
+    def search(self, board, max_depth, start_time, stop_time, soft_stop_time=None):
+        """
+        Same contract as board_tree.iterative_deepening, run on every process.
+        Only the main search looks at soft_stop_time; helpers stop with it.
+        Returns (best_move, depth, value) of the deepest completed iteration.
+        Total nodes of all processes are left in self.nodes.
+        """
+        request = (board.root().fen(), list(board.move_stack), max_depth, start_time, stop_time,
+                   board_tree.transposition_table.generation)
+        for _, requests in self.helpers:
+            requests.put(request)
+
+        best = board_tree.iterative_deepening(board, max_depth, start_time, stop_time, soft_stop_time=soft_stop_time)
+        nodes = board_tree.search_info["nodes"]
+
+        # The main search is over (time, depth or stop_search): stop the helpers and collect their results
+        self.stop_event.set()
+        pending = len(self.helpers)
+        while pending > 0:
+            try:
+                best_move, depth, value, helper_nodes = self.results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                # A helper that died (e.g. from an exception in its search) never sends its result
+                dead = [helper for helper in self.helpers if not helper[0].is_alive()]
+                for helper in dead:
+                    print(f"Lazy SMP helper exited with code {helper[0].exitcode}, continuing without it")
+                    self.helpers.remove(helper)
+                pending -= len(dead)
+                continue
+            pending -= 1
+            nodes += helper_nodes
+            if best_move is not None and (best[0] is None or depth > best[1]):
+                best = (best_move, depth, value)
+        self.stop_event.clear()
+        self.nodes = nodes
+        return best
+
+    def close(self):
+        """Stops the helpers and frees the shared table."""
+        for process, requests in self.helpers:
+            requests.put(None)
+        for process, requests in self.helpers:
+            process.join()
+        self.helpers = []
+        board_tree.transposition_table = self.previous_table
+        self.shm.close()
+        self.shm.unlink()
+
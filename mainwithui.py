@@ -1,12 +1,14 @@
-import time
-from board_tree import find_best_move_iterative_deepening_tt_book_aw
+import argparse
+from board_tree import format_score
+from search_worker import SearchWorker
+from time_manager import allocate_time
 from LogicChess import ChessGame
 from UI import *
 from constant import *
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, threads=1):
         pygame.init()
 
         self.click_sound = pygame.mixer.Sound('assets/mouseClick.wav')
@@ -62,7 +64,17 @@ class Game:
         self.color_confirmation_timer = 0  # Timer for showing color confirmation
         self.color_confirmation_duration = 1000  # Show confirmation for 1 second
         self.player_just_moved = False
+
+        # AI search runs in the background so the window keeps repainting
+        self.search_worker = SearchWorker(threads)
+        self.ai_depth = 8
+        self.ai_time_limit = 6  # Seconds per move without a timer; with one, the time is allocated from the AI's clock
+        self.ponder = True  # Keep searching the predicted reply while the player thinks
+        self.last_ai_move = None
+        self.info_font = pygame.font.SysFont('comicsans', 18)
+
     def handle_game_over(self):
+        self.search_worker.cancel()
         self.game_over = True
         self.game_result_text = self.game.get_game_result()
         self.game_over_time = pygame.time.get_ticks()
@@ -115,6 +127,19 @@ class Game:
                     if self.player2_time < 0:
                         self.game.declare_winner(chess.WHITE)  # trắng thắng
 
+    def ai_clock(self):
+        """Seconds left on the AI's clock, or None when the game has no timer."""
+        if self.game_mode == NO_TIMER or self.base_time <= 0:
+            return None
+        return self.player2_time if self.player_color == chess.WHITE else self.player1_time
+
+    def ai_move_time(self):
+        """Seconds the AI aims to spend on the current move."""
+        time_left = self.ai_clock()
+        if time_left is None:
+            return self.ai_time_limit
+        return allocate_time(time_left, self.increment)[0]
+
     def format_time(self, seconds):
         if seconds < 0:
             return "00:00"
@@ -122,6 +147,22 @@ class Game:
         secs = int(seconds % 60)
         return f"{minutes:02}:{secs:02}"
 
+    def draw_search_info(self, surface):
+        info = self.search_worker.info()
+        if self.search_worker.is_pondering():
+            status = f"AI pondering {self.search_worker.pondering_move}..."
+        elif self.search_worker.is_running():
+            status = "AI thinking..."
+        else:
+            status = "AI idle"
+        score = "-" if info["score"] is None else format_score(info["score"])
+        pv = " ".join(move.uci() for move in info["pv"][:4])
+        lines = [status, f"Depth: {info['depth']}", f"Score: {score}", f"Nodes: {info['nodes']}", f"PV: {pv}"]
+        x = (WIDTH + BOARD_SIZE) // 2 + 10
+        for i, line in enumerate(lines):
+            text = self.info_font.render(line, True, (255, 255, 255))
+            surface.blit(text, (x, 80 + i * 24))
+
     def draw_timer(self, surface):
         timer1_text = self.font.render(self.format_time(self.player2_time), True, (0, 0, 0))
         timer2_text = self.font.render(self.format_time(self.player1_time), True, (0, 0, 0))
@@ -180,6 +221,8 @@ class Game:
             board_y = (HEIGHT - BOARD_SIZE) // 2
             board_surface = surface.subsurface((board_x, board_y, BOARD_SIZE, BOARD_SIZE))
             draw_board(board_surface, self.board)
+            if self.last_ai_move:
+                draw_ai_move(board_surface, self.last_ai_move.from_square, self.last_ai_move.to_square)
             if self.selected_square:
                 selected_row, selected_col = self.selected_square
                 draw_selected_square(surface.subsurface((board_x, board_y, BOARD_SIZE, BOARD_SIZE)),
@@ -199,6 +242,8 @@ class Game:
                 self.resign_white_button.show_button(surface)
                 self.resign_black_button.show_button(surface)
             self.draw_captured_pieces(surface)
+            if self.game_mode == PVE_MODE:
+                self.draw_search_info(surface)
         elif self.game_state == GAME_MODE_MENU:
             draw_background(surface)
             overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -336,6 +381,7 @@ class Game:
                 self.click_sound.play()
 
             if event.type == pygame.QUIT:
+                self.search_worker.close()
                 self.running = False
             if self.game_state == MAIN_MENU:
                 self.game_menu.handle_settings_click(event)
@@ -421,7 +467,11 @@ class Game:
                         self.game_result_text = ""
                         self.captured_pieces_white=[]
                         self.captured_pieces_black=[]
+                        self.search_worker.cancel()
+                        self.last_ai_move = None
                     elif self.menu_button and self.menu_button.is_clicked(event):
+                        self.search_worker.cancel()
+                        self.last_ai_move = None
                         self.game_state = MAIN_MENU
                         self.game.reset_game()
                         self.reset_timer()
@@ -446,43 +496,55 @@ class Game:
                     print("Error: player_color is None in PVE mode. Cannot proceed without color selection.")
                     return
                 if self.board.turn != self.player_color and not self.game_over and not self.player_just_moved:
-                    print(
-                        f"AI turn - Current turn: {'White' if self.board.turn == chess.WHITE else 'Black'}, Player color: {'White' if self.player_color == chess.WHITE else 'Black'}")
-                    depth = 8
-                    time_limit_sec = 6
-                    start_time = time.time()
-                    best_move = find_best_move_iterative_deepening_tt_book_aw(self.board, depth, time_limit_sec)
-                    elapsed_time = time.time() - start_time
-                    print(f"AI move computed in {elapsed_time:.2f} seconds: {best_move}")
-                    if best_move is None:
-                        print("Error: find_best_move returned None. Skipping AI move.")
+                    if self.search_worker.is_pondering():
+                        if self.board.move_stack and self.board.peek() == self.search_worker.pondering_move:
+                            print(f"Ponder hit: {self.search_worker.pondering_move}")
+                            self.search_worker.ponderhit(self.ai_move_time())
+                        else:
+                            print("Ponder miss, starting a new search")
+                            self.search_worker.cancel()
+                    if not self.search_worker.is_running():
+                        print(
+                            f"AI turn - Current turn: {'White' if self.board.turn == chess.WHITE else 'Black'}, Player color: {'White' if self.player_color == chess.WHITE else 'Black'}")
+                        time_left = self.ai_clock()
+                        if time_left is None:
+                            self.search_worker.start(self.board, self.ai_depth, self.ai_time_limit)
+                        else:
+                            self.search_worker.start(self.board, self.ai_depth, time_left, time_left, self.increment)
                     else:
-                        board_x = (WIDTH - BOARD_SIZE) // 2
-                        board_y = (HEIGHT - BOARD_SIZE) // 2
-                        board_surface = self.screen.subsurface((board_x, board_y, BOARD_SIZE, BOARD_SIZE))
-                        draw_ai_move(board_surface, best_move.from_square, best_move.to_square)
-
-                        from_sq = best_move.from_square
-                        to_sq = best_move.to_square
-                        captured_piece = self.board.piece_at(to_sq)
-
-                        self.game.push_move(best_move.uci())
-                        self.board = self.game.get_board()
-                        print(f"After AI move - New turn: {'White' if self.board.turn == chess.WHITE else 'Black'}")
-
-                        if captured_piece:
-                            if captured_piece.color == chess.WHITE:
-                                self.captured_pieces_white.append(captured_piece)
-                            else:
-                                self.captured_pieces_black.append(captured_piece)
-
-                        if self.game_mode != NO_TIMER:
-                            if self.current_player == chess.WHITE:
-                                self.player1_time += self.increment
-                            else:
-                                self.player2_time += self.increment
-                        self.current_player = not self.current_player
-                        self.player_just_moved = False
+                        best_move = self.search_worker.poll()  # None while the search is still running
+                        if best_move is None:
+                            if not self.search_worker.is_running():
+                                print("Error: find_best_move returned None. Skipping AI move.")
+                        else:
+                            print(f"AI move computed in {self.search_worker.info()['elapsed']:.2f} seconds: {best_move}")
+                            self.last_ai_move = best_move
+
+                            from_sq = best_move.from_square
+                            to_sq = best_move.to_square
+                            captured_piece = self.board.piece_at(to_sq)
+
+                            self.game.push_move(best_move.uci())
+                            self.board = self.game.get_board()
+                            print(f"After AI move - New turn: {'White' if self.board.turn == chess.WHITE else 'Black'}")
+
+                            if captured_piece:
+                                if captured_piece.color == chess.WHITE:
+                                    self.captured_pieces_white.append(captured_piece)
+                                else:
+                                    self.captured_pieces_black.append(captured_piece)
+
+                            if self.game_mode != NO_TIMER:
+                                if self.current_player == chess.WHITE:
+                                    self.player1_time += self.increment
+                                else:
+                                    self.player2_time += self.increment
+                            self.current_player = not self.current_player
+                            self.player_just_moved = False
+
+                            ponder_move = self.search_worker.ponder_move
+                            if self.ponder and ponder_move and not self.board.is_game_over():
+                                self.search_worker.ponder(self.board, ponder_move, self.ai_depth)
 
             if self.game_mode != NO_TIMER:
                 self.update_timer(dt)
@@ -491,5 +553,8 @@ class Game:
 
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Chess Game")
+    parser.add_argument("--threads", type=int, default=1, help="number of processes for the Lazy SMP search")
+    args = parser.parse_args()
+    game = Game(args.threads)
     game.run()
\ No newline at end of file
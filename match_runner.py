@@ -0,0 +1,313 @@
+"""
+Engine-vs-Stockfish matches played in parallel.
+
+Every worker process has its own copy of the engine and its own Stockfish
+subprocess. Openings are sampled from the opening book and each one is played
+twice with colors reversed. Results are aggregated into W/D/L and an Elo
+estimate with a 95% error margin, and every game is appended to a PGN file as
+soon as it finishes.
+
+Usage:
+    python match_runner.py [--games N] [--workers N] [--tc BASE+INC] [--stockfish-elo ELO] [--pgn FILE]
+"""
+import argparse
+import datetime
+import importlib
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from multiprocessing.util import Finalize
+
+import chess
+import chess.engine
+import chess.pgn
+import chess.polyglot
+
+import board_tree
+import evaluation_advanced
+from search_heuristics import SearchHeuristics
+from transposition_table import TranspositionTable
+
+DEFAULT_TIME_CONTROL = "60+1"
+MAX_GAME_PLIES = 400  # Adjudicated as a draw after this many plies
+OPENING_PLIES = 8
+MAX_SEARCH_DEPTH = 20
+
+_context = multiprocessing.get_context("spawn")
+
+
+def parse_time_control(text):
+    """'60+1' -> (60.0, 1.0): base seconds per game and increment per move."""
+    base, _, increment = text.partition("+")
+    return float(base), float(increment or 0)
+
+
+def sample_openings(count, plies=OPENING_PLIES, seed=1):
+    """
+    Samples count distinct openings of the given length by walking the opening
+    book with its weights. Falls back to the initial position without a book.
+    """
+    rng = random.Random(seed)
+    openings = []
+    try:
+        reader = chess.polyglot.open_reader(board_tree.OPENING_BOOK_PATH)
+    except OSError:
+        print(f"Opening book not found at {board_tree.OPENING_BOOK_PATH}, all games start from the initial position")
+        return [[] for _ in range(count)]
+    with reader:
+        attempts = 0
+        while len(openings) < count:
+            board = chess.Board()
+            for _ in range(plies):
+                try:
+                    board.push(reader.weighted_choice(board, random=rng).move)
+                except IndexError:  # Out of book
+                    break
+            attempts += 1
+            # Repeats are only accepted once the book seems exhausted
+            if board.move_stack not in openings or attempts > count * 20:
+                openings.append(list(board.move_stack))
+    return openings
+
+
+def elo_from_score(score):
+    """Elo difference corresponding to an expected score, clamped away from 0 and 1."""
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_with_error(wins, draws, losses):
+    """Elo difference and its 95% margin from a W/D/L record."""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo_from_score(score), (elo_from_score(score + margin) - elo_from_score(score - margin)) / 2
+
+
+def _resolve(name):
+    """'NMR_REDUCTION' -> (board_tree, 'NMR_REDUCTION'); 'evaluation_advanced.X' -> (evaluation_advanced, 'X')."""
+    module_name, _, attr = name.rpartition(".")
+    return importlib.import_module(module_name or "board_tree"), attr
+
+
+def swap_globals(overrides):
+    """Sets module globals named as in _resolve. Returns the previous values, to swap them back."""
+    previous = {}
+    for name, value in overrides.items():
+        module, attr = _resolve(name)
+        previous[name] = getattr(module, attr)
+        setattr(module, attr, value)
+    return previous
+
+
+class EnginePlayer:
+    """
+    Our engine, board_tree's iterative deepening. params overrides module
+    globals while the player is on move (e.g. {"NMR_REDUCTION": 3}), so two
+    configurations can play each other in one process; each player also keeps
+    its own transposition table, move ordering tables and evaluation caches.
+    """
+
+    def __init__(self, name="Chess--BTL-AI", params=None):
+        self.name = name
+        self.params = params or {}
+        self.state = {
+            "transposition_table": TranspositionTable(board_tree.TT_SIZE_MB),
+            "heuristics": SearchHeuristics(),
+            "evaluation_advanced.eval_cache": evaluation_advanced.EvalCache(),
+            "evaluation_advanced.pawn_cache": evaluation_advanced.PawnHashTable(),
+        }
+
+    def new_game(self):
+        self.state["transposition_table"].clear()
+        self.state["heuristics"].clear()
+
+    def play(self, board, time_left, increment, opponent_time_left):
+        previous = swap_globals({**self.state, **self.params})
+        try:
+            return board_tree.find_best_move_iterative_deepening_tt_book_aw(board, MAX_SEARCH_DEPTH, time_left,
+                                                                           time_left=time_left, increment=increment)
+        finally:
+            swap_globals(previous)
+
+    def close(self):
+        pass
+
+
+class StockfishPlayer:
+    """Stockfish over UCI, optionally limited to an Elo rating or a fixed depth."""
+
+    def __init__(self, path, elo=None, depth=None):
+        self.engine = chess.engine.SimpleEngine.popen_uci(path)
+        if elo is not None:
+            self.engine.configure({"UCI_LimitStrength": True, "UCI_Elo": elo})
+        self.depth = depth
+        self.name = f"Stockfish {elo}" if elo is not None else "Stockfish"
+
+    def new_game(self):
+        pass
+
+    def play(self, board, time_left, increment, opponent_time_left):
+        if self.depth is not None:
+            limit = chess.engine.Limit(depth=self.depth)
+        elif board.turn == chess.WHITE:
+            limit = chess.engine.Limit(white_clock=time_left, black_clock=opponent_time_left,
+                                       white_inc=increment, black_inc=increment)
+        else:
+            limit = chess.engine.Limit(white_clock=opponent_time_left, black_clock=time_left,
+                                       white_inc=increment, black_inc=increment)
+        return self.engine.play(board, limit, game=board.root()).move
+
+    def close(self):
+        self.engine.quit()
+
+
+def game_finished(board):
+    """
+    Checkmate, stalemate, insufficient material, or a threefold repetition or fifty-move
+    rule that has actually occurred. A threefold the side to move could only claim by
+    playing a move does not end the game.
+    """
+    return board.outcome() is not None or board.is_repetition(3) or board.halfmove_clock >= 100
+
+
+def play_game(white, black, opening, time_control):
+    """Plays one game with both players' clocks. Returns the finished chess.pgn.Game."""
+    base, increment = time_control
+    board = chess.Board()
+    for move in opening:
+        board.push(move)
+    players = {chess.WHITE: white, chess.BLACK: black}
+    clocks = {chess.WHITE: base, chess.BLACK: base}
+    for player in players.values():
+        player.new_game()
+
+    result = None
+    termination = "normal"
+    while not game_finished(board):
+        if len(board.move_stack) >= MAX_GAME_PLIES:
+            result, termination = "1/2-1/2", "adjudication"
+            break
+        color = board.turn
+        tic = time.time()
+        move = players[color].play(board, clocks[color], increment, clocks[not color])
+        clocks[color] -= time.time() - tic
+        if clocks[color] < 0:
+            result, termination = ("0-1" if color == chess.WHITE else "1-0"), "time forfeit"
+            break
+        clocks[color] += increment
+        if move is None or move not in board.legal_moves:
+            result, termination = ("0-1" if color == chess.WHITE else "1-0"), "rules infraction"
+            break
+        board.push(move)
+    if result is None:
+        outcome = board.outcome()
+        result = outcome.result() if outcome is not None else "1/2-1/2" # Repetition or fifty-move rule
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "Engine match"
+    game.headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
+    game.headers["White"] = white.name
+    game.headers["Black"] = black.name
+    game.headers["Result"] = result
+    game.headers["TimeControl"] = f"{base:g}+{increment:g}"
+    game.headers["Termination"] = termination
+    return game
+
+
+# --- Worker processes ---
+_engine_player = None
+_stockfish_player = None
+
+
+def _init_worker(stockfish_path, stockfish_elo, stockfish_depth, verbose):
+    global _engine_player, _stockfish_player
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")  # The search prints every completed depth
+    _engine_player = EnginePlayer()
+    _stockfish_player = StockfishPlayer(stockfish_path, stockfish_elo, stockfish_depth)
+    Finalize(_stockfish_player, _stockfish_player.close, exitpriority=0)
+
+
+def _play_match_game(task):
+    game_index, opening, engine_color, time_control = task
+    if engine_color == chess.WHITE:
+        game = play_game(_engine_player, _stockfish_player, opening, time_control)
+    else:
+        game = play_game(_stockfish_player, _engine_player, opening, time_control)
+    game.headers["Round"] = str(game_index + 1)
+    return game_index, engine_color, game.headers["Result"], str(game)
+
+
+def run_match(games=10, workers=None, time_control=DEFAULT_TIME_CONTROL, stockfish_elo=2400,
+              stockfish_depth=None, pgn_path="match.pgn", seed=1, verbose=False):
+    """Plays the match on a process pool and returns (wins, draws, losses) from our engine's side."""
+    if not os.path.exists(board_tree.STOCKFISH_PATH):
+        print(f"Error: Stockfish executable not found at '{board_tree.STOCKFISH_PATH}'")
+        print("Please download Stockfish and update the STOCKFISH_PATH variable.")
+        return None
+
+    workers = workers or os.cpu_count()
+    time_control = parse_time_control(time_control)
+    openings = sample_openings((games + 1) // 2, seed=seed)
+    # Each opening is played twice, with our engine on either side
+    tasks = [(index, openings[index // 2], chess.WHITE if index % 2 == 0 else chess.BLACK, time_control)
+             for index in range(games)]
+
+    wins = draws = losses = 0
+    print(f"Playing {games} games on {workers} processes, time control {time_control[0]:g}+{time_control[1]:g}")
+    print(f"\n{'Game':<6}{'Color':<7}{'Result':<8}{'W-D-L':<12}{'Elo':<16}")
+    print("-" * 49)
+    with open(pgn_path, "a") as pgn_file, _context.Pool(
+            workers, initializer=_init_worker,
+            initargs=(board_tree.STOCKFISH_PATH, stockfish_elo, stockfish_depth, verbose)) as pool:
+        for game_index, engine_color, result, pgn in pool.imap_unordered(_play_match_game, tasks):
+            pgn_file.write(pgn + "\n\n")
+            pgn_file.flush()
+
+            if result == "1/2-1/2":
+                draws += 1
+                outcome = "Draw"
+            elif (result == "1-0") == (engine_color == chess.WHITE):
+                wins += 1
+                outcome = "Win"
+            else:
+                losses += 1
+                outcome = "Loss"
+            elo, margin = elo_with_error(wins, draws, losses)
+            color = "White" if engine_color == chess.WHITE else "Black"
+            print(f"{game_index + 1:<6}{color:<7}{outcome:<8}{f'{wins}-{draws}-{losses}':<12}"
+                  f"{f'{elo:+.1f} +/- {margin:.1f}':<16}")
+
+    elo, margin = elo_with_error(wins, draws, losses)
+    print("\n=== Final Results ===")
+    print(f"Games: {games} | Wins: {wins} | Draws: {draws} | Losses: {losses}")
+    print(f"Elo difference: {elo:+.1f} +/- {margin:.1f} (95%), vs Stockfish {stockfish_elo}: "
+          f"{stockfish_elo + elo:.0f}")
+    print(f"Games saved to {pgn_path}")
+    return wins, draws, losses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine vs Stockfish match on a process pool")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None, help="processes, one Stockfish each (default: all cores)")
+    parser.add_argument("--tc", default=DEFAULT_TIME_CONTROL, help="time control as BASE+INC in seconds")
+    parser.add_argument("--stockfish-elo", type=int, default=2400)
+    parser.add_argument("--stockfish-depth", type=int, default=None, help="fixed depth instead of the clock")
+    parser.add_argument("--pgn", default="match.pgn", help="PGN file the games are appended to")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the opening sampling")
+    parser.add_argument("--verbose", action="store_true", help="keep the search output of the workers")
+    args = parser.parse_args()
+    run_match(args.games, args.workers, args.tc, args.stockfish_elo, args.stockfish_depth, args.pgn, args.seed,
+              args.verbose)
+
+
+if __name__ == "__main__":
+    main()
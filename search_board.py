@@ -0,0 +1,175 @@
+import chess
+import chess.polyglot
+
+from dynamic_PstAndPieceValue import EG_TABLE, MG_TABLE, PHASE_VALUES, material_pst_scores
+
+# When enabled, every push checks the incremental keys and scores against a full recomputation
+ZOBRIST_DEBUG = False
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+# ZOBRIST_PIECES[color][piece_type][square], same layout as chess.polyglot
+ZOBRIST_PIECES = [
+    [[0] * 64] + [[_RANDOM[64 * ((piece_type - 1) * 2 + color) + square] for square in chess.SQUARES]
+                  for piece_type in chess.PIECE_TYPES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+# Indexed by a 4-bit mask: 1 = white short, 2 = white long, 4 = black short, 8 = black long
+ZOBRIST_CASTLING = [0] * 16
+for _mask in range(16):
+    for _bit in range(4):
+        if _mask & (1 << _bit):
+            ZOBRIST_CASTLING[_mask] ^= _RANDOM[768 + _bit]
+ZOBRIST_EP = [_RANDOM[772 + file] for file in range(8)]
+ZOBRIST_TURN = _RANDOM[780]
+
+
+def pawn_zobrist_hash(board):
+    """Zobrist key of the pawns alone, used to index the pawn hash table."""
+    key = 0
+    for color in chess.COLORS:
+        table = ZOBRIST_PIECES[color][chess.PAWN]
+        for square in chess.scan_reversed(board.pawns & board.occupied_co[color]):
+            key ^= table[square]
+    return key
+
+
+def castling_index(castling_rights):
+    """Maps python-chess castling rights (a mask of rook squares) to an index into ZOBRIST_CASTLING."""
+    return (bool(castling_rights & chess.BB_H1) | bool(castling_rights & chess.BB_A1) << 1
+            | bool(castling_rights & chess.BB_H8) << 2 | bool(castling_rights & chess.BB_A8) << 3)
+
+
+class SearchBoard(chess.Board):
+    """
+    chess.Board used inside the search. Keeps the Polyglot Zobrist key of the
+    position in zobrist_key, and the pawn-only key in pawn_key, and updates
+    them incrementally on push/pop instead of rehashing all 64 squares at every node.
+    The material+PST totals (mg_score/eg_score, White minus Black) and the
+    phase material are maintained the same way for the evaluation.
+    Only standard chess is supported.
+    """
+
+    def __init__(self, fen=chess.STARTING_FEN):
+        super().__init__(fen)
+        self.castling_rights = self.clean_castling_rights()
+        self._zobrist_stack = []
+        self.zobrist_key = chess.polyglot.zobrist_hash(self)
+        self.pawn_key = pawn_zobrist_hash(self)
+        self.mg_score, self.eg_score, self.phase_material = material_pst_scores(self)
+
+    @classmethod
+    def from_board(cls, board):
+        """Creates a search board with the same position and move history as board."""
+        search_board = cls(board.root().fen())
+        for move in board.move_stack:
+            search_board.push(move)
+        return search_board
+
+    def copy(self, *, stack=True):
+        board = super().copy(stack=stack)
+        board.zobrist_key = self.zobrist_key
+        board.pawn_key = self.pawn_key
+        board.mg_score = self.mg_score
+        board.eg_score = self.eg_score
+        board.phase_material = self.phase_material
+        board._zobrist_stack = self._zobrist_stack[len(self._zobrist_stack) - len(board.move_stack):]
+        return board
+
+    def _ep_hash(self):
+        """Polyglot only hashes the en passant file if a pawn could capture there."""
+        ep_square = self.ep_square
+        if self.turn == chess.WHITE:
+            ep_mask = chess.BB_PAWN_ATTACKS[chess.BLACK][ep_square]
+        else:
+            ep_mask = chess.BB_PAWN_ATTACKS[chess.WHITE][ep_square]
+        if ep_mask & self.pawns & self.occupied_co[self.turn]:
+            return ZOBRIST_EP[ep_square & 7]
+        return 0
+
+    def push(self, move):
+        key = self.zobrist_key
+        pawn_key = self.pawn_key
+        mg = self.mg_score
+        eg = self.eg_score
+        phase_material = self.phase_material
+        self._zobrist_stack.append((key, pawn_key, mg, eg, phase_material))
+        turn = self.turn
+        castling_before = self.castling_rights
+        if self.ep_square is not None:
+            key ^= self._ep_hash()
+
+        if move:
+            from_square = move.from_square
+            to_square = move.to_square
+            ours = ZOBRIST_PIECES[turn]
+            theirs = ZOBRIST_PIECES[not turn]
+            sign = 1 if turn == chess.WHITE else -1
+            our_mg, our_eg = MG_TABLE[turn], EG_TABLE[turn]
+            their_mg, their_eg = MG_TABLE[not turn], EG_TABLE[not turn]
+            piece_type = self.piece_type_at(from_square)
+            captured = self.piece_type_at(to_square)
+            key ^= ours[piece_type][from_square]
+            mg -= sign * our_mg[piece_type][from_square]
+            eg -= sign * our_eg[piece_type][from_square]
+
+            if piece_type == chess.KING and (captured == chess.ROOK and self.occupied_co[turn] & chess.BB_SQUARES[to_square]
+                                              or abs(to_square - from_square) == 2):
+                # Castling, given either as king takes rook or as a two-square king move
+                backrank = from_square & 56
+                if to_square > from_square:
+                    king_to, rook_from, rook_to = backrank + 6, backrank + 7, backrank + 5
+                else:
+                    king_to, rook_from, rook_to = backrank + 2, backrank, backrank + 3
+                key ^= ours[chess.KING][king_to] ^ ours[chess.ROOK][rook_from] ^ ours[chess.ROOK][rook_to]
+                mg += sign * (our_mg[chess.KING][king_to] + our_mg[chess.ROOK][rook_to] - our_mg[chess.ROOK][rook_from])
+                eg += sign * (our_eg[chess.KING][king_to] + our_eg[chess.ROOK][rook_to] - our_eg[chess.ROOK][rook_from])
+            else:
+                if captured:
+                    key ^= theirs[captured][to_square]
+                    mg += sign * their_mg[captured][to_square]
+                    eg += sign * their_eg[captured][to_square]
+                    phase_material -= PHASE_VALUES[captured]
+                    if captured == chess.PAWN:
+                        pawn_key ^= theirs[chess.PAWN][to_square]
+                elif piece_type == chess.PAWN and to_square == self.ep_square:
+                    capture_square = to_square - 8 if turn == chess.WHITE else to_square + 8
+                    key ^= theirs[chess.PAWN][capture_square]
+                    pawn_key ^= theirs[chess.PAWN][capture_square]
+                    mg += sign * their_mg[chess.PAWN][capture_square]
+                    eg += sign * their_eg[chess.PAWN][capture_square]
+                    phase_material -= PHASE_VALUES[chess.PAWN]
+                to_piece_type = move.promotion or piece_type
+                key ^= ours[to_piece_type][to_square]
+                mg += sign * our_mg[to_piece_type][to_square]
+                eg += sign * our_eg[to_piece_type][to_square]
+                if move.promotion:
+                    phase_material += PHASE_VALUES[move.promotion] - PHASE_VALUES[chess.PAWN]
+                if piece_type == chess.PAWN:
+                    pawn_key ^= ours[chess.PAWN][from_square]
+                    if not move.promotion:
+                        pawn_key ^= ours[chess.PAWN][to_square]
+
+        super().push(move)
+
+        if self.castling_rights != castling_before:
+            key ^= ZOBRIST_CASTLING[castling_index(castling_before)] ^ ZOBRIST_CASTLING[castling_index(self.castling_rights)]
+        if self.ep_square is not None:
+            key ^= self._ep_hash()
+        key ^= ZOBRIST_TURN
+        self.zobrist_key = key
+        self.pawn_key = pawn_key
+        self.mg_score = mg
+        self.eg_score = eg
+        self.phase_material = phase_material
+
+        if ZOBRIST_DEBUG:
+            expected = chess.polyglot.zobrist_hash(self)
+            assert key == expected, f"Incremental Zobrist key {key:016x} != {expected:016x} after {move} in {self.fen()}"
+            assert pawn_key == pawn_zobrist_hash(self), f"Incremental pawn key mismatch after {move} in {self.fen()}"
+            assert (mg, eg, phase_material) == material_pst_scores(self), f"Incremental scores mismatch after {move} in {self.fen()}"
+
+    def pop(self):
+        move = super().pop()
+        self.zobrist_key, self.pawn_key, self.mg_score, self.eg_score, self.phase_material = self._zobrist_stack.pop()
+        return move
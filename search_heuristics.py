@@ -0,0 +1,129 @@
+"""
+Move ordering heuristics learned during the search: killer moves, counter-moves
+and history tables.
+
+Moves are ints as produced by BitboardBoard (from | to << 6 | promotion << 12).
+A piece-to key identifies a move by the piece that made it and its target
+square, ((piece_type - 1) * 2 + color) * 64 + to, and stays meaningful in
+positions other than the one the move was played in.
+
+History values are updated with gravity: a bonus moves a value towards
+HISTORY_MAX by a step that shrinks as the value approaches it, so the tables
+never overflow; halving them at every root search lets recent results outweigh
+old ones.
+"""
+
+MAX_PLY = 128  # Deepest ply of the search, sizes the per-ply tables here and in board_tree
+KILLER_MOVES_COUNT = 2  # Killer moves kept per ply
+HISTORY_MAX = 16384
+HISTORY_BONUS_MAX = 1200  # Bonus of depth * depth, capped at this
+PIECE_TO_KEYS = 12 * 64
+
+
+def piece_to_key(board, move):
+    """Piece-to key of a move that has just been played on board, -1 for the null move."""
+    if not move:
+        return -1
+    to_square = move >> 6 & 63
+    return ((board.mailbox[to_square] - 1) * 2 + (not board.turn)) * 64 + to_square
+
+
+def history_bonus(depth):
+    return min(depth * depth, HISTORY_BONUS_MAX)
+
+
+class SearchHeuristics:
+    """
+    Quiet-move ordering state of one engine, shared by all searches of a game.
+
+    killers[ply]: quiet moves that caused a beta cutoff at that ply, most recent first.
+    counter_moves[key]: quiet move that refuted the move with that piece-to key.
+    butterfly[color][from | to << 6]: history of quiet moves by side and squares.
+    continuation[key][key]: history of a quiet move (second piece-to key) played after
+    the move with the first key, one ply (counter-move history) or two plies
+    (follow-up history) earlier. Rows are allocated on first update.
+
+    Call new_search() at the root of every search, enter() at every node before
+    ordering its moves and update() on a quiet beta cutoff.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Forgets everything, as for a new game."""
+        self.killers = [[0] * KILLER_MOVES_COUNT for _ in range(MAX_PLY)]
+        self.counter_moves = [0] * PIECE_TO_KEYS
+        self.butterfly = [[0] * 4096, [0] * 4096]
+        self.continuation = [None] * PIECE_TO_KEYS
+        # Piece-to key of the move leading to the node at ply, -1 at the root or after a null move
+        self.move_keys = [-1] * (MAX_PLY + 1)
+
+    def new_search(self):
+        """
+        Ages the tables at the root of a new search: the killer moves belong to
+        the plies of the previous root and are cleared, the histories are halved.
+        """
+        for killers in self.killers:
+            killers[:] = [0] * KILLER_MOVES_COUNT
+        for table in self.butterfly:
+            table[:] = [value >> 1 for value in table]
+        for row in self.continuation:
+            if row is not None:
+                row[:] = [value >> 1 for value in row]
+
+    def enter(self, board, ply):
+        """Records the move that led to the node at ply. The root never looks further back."""
+        self.move_keys[ply] = piece_to_key(board, board.move_stack[-1]) if ply > 0 else -1
+
+    def counter_move(self, ply):
+        key = self.move_keys[ply]
+        return self.counter_moves[key] if key >= 0 else 0
+
+    def quiet_score(self, board, ply):
+        """Key function giving the history score of a quiet move at the node at ply."""
+        turn = board.turn
+        mailbox = board.mailbox
+        butterfly = self.butterfly[turn]
+        rows = [self.continuation[key] for key in self.continuation_keys(ply) if key >= 0]
+        rows = [row for row in rows if row is not None]
+
+        def score(move):
+            value = butterfly[move & 4095]
+            if rows:
+                to_square = move >> 6 & 63
+                key = ((mailbox[move & 63] - 1) * 2 + turn) * 64 + to_square
+                for row in rows:
+                    value += row[key]
+            return value
+
+        return score
+
+    def continuation_keys(self, ply):
+        """Piece-to keys of the moves one and two plies before the node at ply."""
+        return self.move_keys[ply], self.move_keys[ply - 1] if ply > 1 else -1
+
+    def update(self, board, ply, depth, move):
+        """
+        The quiet move caused a beta cutoff at ply with depth remaining: it becomes
+        a killer and the counter-move, and gets a history bonus.
+        """
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            killers.pop()
+        keys = self.continuation_keys(ply)
+        if keys[0] >= 0:
+            self.counter_moves[keys[0]] = move
+
+        bonus = history_bonus(depth)
+        index = move & 4095
+        butterfly = self.butterfly[board.turn]
+        butterfly[index] += bonus - butterfly[index] * bonus // HISTORY_MAX
+        key = ((board.mailbox[move & 63] - 1) * 2 + board.turn) * 64 + (move >> 6 & 63)
+        for previous_key in keys:
+            if previous_key >= 0:
+                row = self.continuation[previous_key]
+                if row is None:
+                    row = self.continuation[previous_key] = [0] * PIECE_TO_KEYS
+                row[key] += bonus - row[key] * bonus // HISTORY_MAX
@@ -0,0 +1,233 @@
+import atexit
+import math
+import multiprocessing
+import queue
+import time
+
+import chess
+
+import board_tree
+from lazy_smp import LazySMP
+from transposition_table import encode_move, decode_move
+
+# Slots of the shared progress array, followed by the first PV_SLOTS moves of the PV
+INFO_FIELDS = ("depth", "score", "nodes", "best_move")
+INFO_INDEX = {name: index for index, name in enumerate(INFO_FIELDS)}
+PV_SLOTS = 8
+
+RESULT_POLL_SECONDS = 0.5  # Waits for a result are split into slices this long to check the process
+STOP_TIMEOUT = 10  # Seconds a stopped search may take to return before the worker is replaced
+
+# Forking after pygame has started its audio/video threads can leave the child deadlocked
+_context = multiprocessing.get_context("spawn")
+
+
+class SharedSearchInfo:
+    """
+    Stand-in for board_tree.search_info inside the worker process. Writes go to a
+    multiprocessing.Array so the UI process can read the progress of the running
+    iterative deepening without any messages being exchanged.
+    """
+
+    def __init__(self, array):
+        self.array = array
+
+    def __getitem__(self, key):
+        if key == "pv":
+            return read_pv(self.array)
+        return self.array[INFO_INDEX[key]]
+
+    def __setitem__(self, key, value):
+        if key == "pv":
+            codes = [encode_move(move) for move in value[:PV_SLOTS]]
+            self.array[len(INFO_FIELDS):] = codes + [0] * (PV_SLOTS - len(codes))
+            return
+        if key == "score" and value is None:
+            value = math.nan
+        elif key == "best_move":
+            value = encode_move(value)
+        self.array[INFO_INDEX[key]] = value
+
+    def update(self, **values):
+        for key, value in values.items():
+            self[key] = value
+
+
+def read_pv(array):
+    """Moves of the PV stored after the info fields of array, up to the first empty slot."""
+    pv = []
+    for code in array[len(INFO_FIELDS):]:
+        if not code:
+            break
+        pv.append(decode_move(int(code)))
+    return pv
+
+
+def _worker_main(requests, results, stop_event, info_array, threads):
+    """Loop of the worker process: one search per request until None is received."""
+    board_tree.stop_search = stop_event
+    board_tree.search_info = SharedSearchInfo(info_array)
+    smp = LazySMP(threads) if threads > 1 else None
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        root_fen, moves, max_depth, time_limit, time_left, increment = request
+        board = chess.Board(root_fen)
+        for move in moves:
+            board.push(move)
+        if time_limit is None:
+            time_limit = math.inf  # Pondering: runs until the UI stops it
+        best_move = board_tree.find_best_move_iterative_deepening_tt_book_aw(board, max_depth, time_limit, smp,
+                                                                             time_left, increment)
+        results.put((best_move, board_tree.get_ponder_move(board, best_move)))
+    if smp is not None:
+        smp.close()
+
+
+class SearchWorker:
+    """
+    Runs find_best_move_iterative_deepening_tt_book_aw in a long-lived background
+    process so the pygame loop keeps drawing and handling events while the AI thinks.
+    start() sends a position, poll() returns the move once it is ready and
+    cancel() aborts the running search. The process keeps its transposition
+    table between searches, like the engine did when it ran in the UI thread.
+
+    After a search, ponder_move holds the predicted reply. ponder() searches the
+    position after that reply while the opponent thinks; on a ponder hit,
+    ponderhit() turns it into a normal timed search, otherwise cancel() drops it.
+
+    With threads > 1 the worker runs a Lazy SMP search over that many processes.
+
+    If the worker process dies (e.g. from an exception in the search) or does not
+    return within STOP_TIMEOUT of being stopped, it is replaced by a new one and
+    the search it was running is dropped, so the UI never waits on it forever.
+    """
+
+    def __init__(self, threads=1):
+        self.threads = threads
+        self.info_array = _context.Array('d', len(INFO_FIELDS) + PV_SLOTS, lock=False)
+        self._start_process()
+        atexit.register(self.close)
+        self.info_array[INFO_INDEX["score"]] = math.nan
+        self.searching = False
+        self.start_time = 0
+        self.deadline = None
+        self.ponder_move = None  # Predicted reply to the last move found
+        self.pondering_move = None  # Reply the running ponder search assumes
+
+    def _start_process(self):
+        self.requests = _context.Queue()
+        self.results = _context.Queue()
+        self.stop_event = _context.Event()
+        # Not a daemon: daemonic processes cannot start the Lazy SMP helpers
+        self.process = _context.Process(target=_worker_main,
+                                        args=(self.requests, self.results, self.stop_event, self.info_array,
+                                              self.threads))
+        self.process.start()
+
+    def _restart(self):
+        """Replaces a dead or stuck worker process. The search it was running is lost."""
+        print(f"Search worker stopped responding (exit code {self.process.exitcode}), restarting it")
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self._start_process()
+        self.searching = False
+        self.deadline = None
+        self.ponder_move = None
+        self.pondering_move = None
+
+    def start(self, board, max_depth, time_limit, time_left=None, increment=0):
+        """
+        Starts searching board. Any search still running is cancelled first.
+        With time_left, the time is allocated from the clock, capped by time_limit.
+        """
+        self.cancel()
+        self.searching = True
+        self.start_time = time.time()
+        self.requests.put((board.root().fen(), list(board.move_stack), max_depth, time_limit, time_left, increment))
+
+    def ponder(self, board, ponder_move, max_depth):
+        """Searches board after ponder_move without a time limit, until ponderhit() or cancel()."""
+        ponder_board = board.copy()
+        ponder_board.push(ponder_move)
+        self.start(ponder_board, max_depth, None)
+        self.pondering_move = ponder_move
+
+    def ponderhit(self, time_limit):
+        """
+        The opponent played the predicted move: the ponder search becomes the real
+        search. The time already spent pondering counts towards time_limit, so
+        after a long think the move comes back immediately.
+        """
+        self.pondering_move = None
+        self.deadline = self.start_time + time_limit
+
+    def is_running(self):
+        return self.searching
+
+    def is_pondering(self):
+        return self.pondering_move is not None
+
+    def poll(self):
+        """
+        Non-blocking. Returns the best move once the search has finished, otherwise None.
+        A finished ponder search keeps its result until ponderhit().
+        """
+        if not self.searching or self.pondering_move is not None:
+            return None
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.stop_event.set()
+            self.deadline = None
+        try:
+            best_move, self.ponder_move = self.results.get_nowait()
+        except queue.Empty:
+            if not self.process.is_alive():
+                self._restart()  # is_running() is False now, so the caller can start a new search
+            return None
+        self.searching = False
+        self.stop_event.clear()
+        return best_move
+
+    def info(self):
+        """Snapshot of the running search: depth, score, nodes, best_move, pv and elapsed seconds."""
+        depth, score, nodes, move_code = self.info_array[:len(INFO_FIELDS)]
+        return {
+            "depth": int(depth),
+            "score": None if math.isnan(score) else score,
+            "nodes": int(nodes),
+            "best_move": decode_move(int(move_code)),
+            "pv": read_pv(self.info_array),
+            "elapsed": time.time() - self.start_time,
+        }
+
+    def cancel(self):
+        """Stops the running search and drops its result."""
+        if self.searching:
+            self.stop_event.set()
+            # The search returns within TIME_CHECK_NODES nodes once stop_event is set
+            stop_time = time.time() + STOP_TIMEOUT
+            while True:
+                try:
+                    self.results.get(timeout=RESULT_POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    if not self.process.is_alive() or time.time() > stop_time:
+                        self._restart()
+                        break
+            self.searching = False
+        self.stop_event.clear()
+        self.deadline = None
+        self.ponder_move = None
+        self.pondering_move = None
+
+    def close(self):
+        """Cancels any search and shuts the worker process down."""
+        if not self.process.is_alive():
+            return
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
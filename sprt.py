@@ -0,0 +1,175 @@
+"""
+Sequential probability ratio test between two configurations of the engine.
+
+A configuration is a set of overrides of module globals, read from a JSON file
+({"NMR_REDUCTION": 3, "FUTILITY_MARGINS": [0, 150, 250]}) or from a Python
+file defining a PARAMS dict, which can also replace functions such as
+calculate_lmr_reduction. Names without a module refer to board_tree; others
+are written as "evaluation_advanced.THREAT_VALUES". No file means defaults.
+
+Games are played in parallel, each opening twice with colors swapped, and the
+test stops as soon as the log-likelihood ratio of H1 (test is elo1 stronger)
+against H0 (test is elo0 stronger) crosses one of the bounds.
+
+Usage:
+    python sprt.py --test new.json [--base old.json] [--elo0 0] [--elo1 5] [--tc 10+0.1] [--workers N]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import runpy
+import sys
+
+import chess
+
+import match_runner
+from match_runner import EnginePlayer, play_game, elo_with_error
+
+DEFAULT_TIME_CONTROL = "10+0.1"
+MAX_GAMES = 20000
+MAX_OPENINGS = 1000  # Openings are reused in order once a long test runs out of them
+
+_context = multiprocessing.get_context("spawn")
+
+
+def load_params(path):
+    """Overrides from a .json file or from the PARAMS dict of a .py file. None gives the defaults."""
+    if path is None:
+        return {}
+    if path.endswith(".py"):
+        return runpy.run_path(path)["PARAMS"]
+    with open(path) as params_file:
+        return json.load(params_file)
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def sprt_bounds(alpha, beta):
+    """(lower, upper) LLR bounds: H0 is accepted below lower, H1 above upper."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def log_likelihood_ratio(wins, draws, losses, elo0, elo1):
+    """
+    LLR of H1 against H0 for a trinomial W/D/L sample, with the normal
+    approximation of the score used by fishtest and cutechess.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+    score = (wins + 0.5 * draws) / games
+    variance = (wins + 0.25 * draws) / games - score ** 2
+    if variance <= 0:
+        return 0.0
+    s0 = expected_score(elo0)
+    s1 = expected_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) / (2 * variance / games)
+
+
+# --- Worker processes ---
+_players = None
+
+
+def _init_worker(base_path, test_path, verbose):
+    global _players
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")  # The search prints every completed depth
+    _players = (EnginePlayer("base", load_params(base_path)), EnginePlayer("test", load_params(test_path)))
+
+
+def _play_sprt_game(task):
+    game_index, opening, test_color, time_control = task
+    base, test = _players
+    if test_color == chess.WHITE:
+        game = play_game(test, base, opening, time_control)
+    else:
+        game = play_game(base, test, opening, time_control)
+    game.headers["Event"] = "SPRT"
+    game.headers["Round"] = str(game_index + 1)
+    return test_color, game.headers["Result"], str(game)
+
+
+def run_sprt(base_path=None, test_path=None, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05,
+             time_control=DEFAULT_TIME_CONTROL, workers=None, max_games=MAX_GAMES, pgn_path=None, seed=1,
+             verbose=False):
+    """Plays test against base until the SPRT reaches a verdict. Returns "H0", "H1" or None."""
+    workers = workers or os.cpu_count()
+    lower, upper = sprt_bounds(alpha, beta)
+    openings = match_runner.sample_openings(min((max_games + 1) // 2, MAX_OPENINGS), seed=seed)
+    tc = match_runner.parse_time_control(time_control)
+    tasks = ((index, openings[index // 2 % len(openings)], chess.WHITE if index % 2 == 0 else chess.BLACK, tc)
+             for index in range(max_games))
+
+    print(f"SPRT elo0={elo0:g} elo1={elo1:g} alpha={alpha:g} beta={beta:g}, LLR bounds [{lower:.2f}, {upper:.2f}]")
+    print(f"base: {base_path or 'defaults'} | test: {test_path or 'defaults'} | "
+          f"{workers} processes, time control {time_control}")
+
+    wins = draws = losses = 0
+    llr = 0.0
+    verdict = None
+    pgn_file = open(pgn_path, "a") if pgn_path else None
+    pool = _context.Pool(workers, initializer=_init_worker, initargs=(base_path, test_path, verbose))
+    try:
+        for games, (test_color, result, pgn) in enumerate(pool.imap_unordered(_play_sprt_game, tasks), 1):
+            if pgn_file:
+                pgn_file.write(pgn + "\n\n")
+                pgn_file.flush()
+            if result == "1/2-1/2":
+                draws += 1
+            elif (result == "1-0") == (test_color == chess.WHITE):
+                wins += 1
+            else:
+                losses += 1
+            llr = log_likelihood_ratio(wins, draws, losses, elo0, elo1)
+            print(f"Games: {games:<6} W-D-L: {wins}-{draws}-{losses:<10} LLR: {llr:+.2f} [{lower:.2f}, {upper:.2f}]")
+            if llr >= upper:
+                verdict = "H1"
+                break
+            if llr <= lower:
+                verdict = "H0"
+                break
+    finally:
+        pool.terminate()  # Games still running are not needed once there is a verdict
+        pool.join()
+        if pgn_file:
+            pgn_file.close()
+
+    elo, margin = elo_with_error(wins, draws, losses)
+    print("\n=== SPRT Result ===")
+    print(f"Games: {wins + draws + losses} | W-D-L: {wins}-{draws}-{losses} | LLR: {llr:+.2f}")
+    print(f"Elo: {elo:+.1f} +/- {margin:.1f} (95%)")
+    if verdict == "H1":
+        print(f"H1 accepted: test is at least {elo1:g} Elo stronger")
+    elif verdict == "H0":
+        print(f"H0 accepted: test is not {elo1:g} Elo stronger")
+    else:
+        print("No verdict within the game limit")
+    return verdict
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPRT between two engine configurations")
+    parser.add_argument("--base", default=None, help="base configuration (.json or .py), default: current values")
+    parser.add_argument("--test", default=None, help="test configuration (.json or .py)")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=5.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--tc", default=DEFAULT_TIME_CONTROL, help="time control as BASE+INC in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="parallel games (default: all cores)")
+    parser.add_argument("--max-games", type=int, default=MAX_GAMES)
+    parser.add_argument("--pgn", default=None, help="PGN file the games are appended to")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the opening sampling")
+    parser.add_argument("--verbose", action="store_true", help="keep the search output of the workers")
+    args = parser.parse_args()
+    verdict = run_sprt(args.base, args.test, args.elo0, args.elo1, args.alpha, args.beta, args.tc, args.workers,
+                       args.max_games, args.pgn, args.seed, args.verbose)
+    raise SystemExit(0 if verdict == "H1" else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,159 @@
+import chess
+
+# Bound flags stored with each entry
+TT_EXACT = 0
+TT_LOWERBOUND = 1
+TT_UPPERBOUND = 2
+
+# Every entry takes three 64-bit words: verification key, value and packed data
+ENTRY_SIZE = 24
+# Two entries per bucket: slot 0 is depth-preferred, slot 1 is always-replace
+BUCKET_SIZE = 2
+
+# Layout of the packed data word
+MOVE_MASK = 0xFFFF
+DEPTH_SHIFT = 16
+FLAG_SHIFT = 24
+GENERATION_SHIFT = 26
+OCCUPIED_BIT = 1 << 34
+
+DEFAULT_SIZE_MB = 32
+
+
+def encode_move(move):
+    """Packs a chess.Move into 16 bits: from (6), to (6), promotion piece type (3)."""
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    """Inverse of encode_move. Returns None for the empty move code."""
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+def table_bytes(size_mb):
+    """Size in bytes of the buffer of a table of at most size_mb megabytes."""
+    buckets = max(1, int(size_mb * 1024 * 1024) // (ENTRY_SIZE * BUCKET_SIZE))
+    buckets = 1 << (buckets.bit_length() - 1)  # Round down to a power of two
+    return buckets * BUCKET_SIZE * ENTRY_SIZE
+
+
 class TranspositionTable:
-    def __init__(self, size=1000000):  # Adjust size as needed
-        self.table = {}
-        self.size = size
+    """
+    Fixed-size transposition table backed by flat 64-bit arrays.
+    Buckets are indexed by the low bits of the Zobrist key and the full key is
+    kept for verification, so memory use never grows past the requested size.
+
+    The key word is stored XORed with the value and data words, so an entry
+    torn by a concurrent writer fails verification instead of returning mixed
+    data. This lets several processes share one table without locks (Lazy SMP):
+    pass a buffer such as SharedMemory.buf of table_bytes(size_mb) bytes.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB, buffer=None):
+        self.resize(size_mb, buffer)
+
+    def resize(self, size_mb, buffer=None):
+        """Reallocates the table so it uses at most size_mb megabytes. Clears all entries."""
+        size = table_bytes(size_mb)
+        self.size_mb = size_mb
+        self.num_entries = size // ENTRY_SIZE
+        self.mask = self.num_entries // BUCKET_SIZE - 1
+
+        if buffer is None:
+            buffer = bytearray(size)
+        self.buffer = buffer
+        view = memoryview(self.buffer)[:size]
+        words = self.num_entries * 8
+        self.keys = view[:words].cast('Q')
+        self.values = view[words:2 * words].cast('d')
+        self.value_bits = view[words:2 * words].cast('Q')
+        self.data = view[2 * words:].cast('Q')
+
+        self.generation = 0
         self.hits = 0
         self.collisions = 0
 
-    def store(self, board, depth, evaluation, move=None, node_type=None):
-        hash_value = board.zobrist_hash()
-        if hash_value in self.table:
-            self.collisions += 1
-        self.table[hash_value] = {
-            'evaluation': evaluation,
-            'depth': depth,
-            'move': move,
-            'node_type': node_type
-        }
-        # Optional: Implement a mechanism to handle table overflow if needed
-        if len(self.table) > self.size:
-            # Simple replacement strategy (e.g., replace oldest entry or entry with lower depth)
-            self.table.pop(next(iter(self.table)))
-
-    def lookup(self, board, depth, alpha, beta):
-        hash_value = board.zobrist_hash()
-        if hash_value in self.table:
-            entry = self.table[hash_value]
-            if entry['depth'] >= depth:
-                self.hits += 1
-                eval = entry['evaluation']
-                node_type = entry.get('node_type')
-
-                if node_type == 'exact':
-                    return eval, entry.get('move')
-                elif node_type == 'alpha':
-                    if eval <= alpha:
-                        return alpha, entry.get('move')
-                elif node_type == 'beta':
-                    if eval >= beta:
-                        return beta, entry.get('move')
-            return None, entry.get('move')  # Return stored move for move ordering
-        return None, None
-
-    def get_stored_move(self, board):
-        hash_value = board.zobrist_hash()
-        if hash_value in self.table:
-            return self.table[hash_value].get('move')
-        return None
+    def new_search(self):
+        """Ages the table. Entries from older searches become preferred victims for replacement."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        """
+        Looks up a position by Zobrist key.
+        Returns (value, depth, flag, move_code) or None if the position is not stored.
+        """
+        index = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+        value_bits = self.value_bits
+        if keys[index] ^ data[index] ^ value_bits[index] != key:
+            index += 1
+            if keys[index] ^ data[index] ^ value_bits[index] != key:
+                return None
+        entry = data[index]
+        if not entry & OCCUPIED_BIT:
+            return None
+        self.hits += 1
+        return (self.values[index], (entry >> DEPTH_SHIFT) & 0xFF,
+                (entry >> FLAG_SHIFT) & 0x3, entry & MOVE_MASK)
+
+    def store(self, key, depth, flag, value, move_code=0):
+        """
+        Stores a search result. The depth-preferred slot is overwritten only by
+        an equal or deeper result, or when its entry is from an older search;
+        everything else goes to the always-replace slot.
+        """
+        index = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+        value_bits = self.value_bits
+
+        if data[index] and keys[index] ^ data[index] ^ value_bits[index] == key:
+            slot = index
+        elif data[index + 1] and keys[index + 1] ^ data[index + 1] ^ value_bits[index + 1] == key:
+            slot = index + 1
+        else:
+            old = data[index]
+            if (not old or depth >= (old >> DEPTH_SHIFT) & 0xFF
+                    or (old >> GENERATION_SHIFT) & 0xFF != self.generation):
+                slot = index
+            else:
+                slot = index + 1
+            if data[slot]:
+                self.collisions += 1
+
+        # Keep the previous best move if this result did not produce one
+        if not move_code and keys[slot] ^ data[slot] ^ value_bits[slot] == key:
+            move_code = data[slot] & MOVE_MASK
+
+        entry = (OCCUPIED_BIT | (self.generation << GENERATION_SHIFT) | (flag << FLAG_SHIFT)
+                 | (min(max(depth, 0), 0xFF) << DEPTH_SHIFT) | move_code)
+        self.values[slot] = value
+        data[slot] = entry
+        keys[slot] = key ^ entry ^ value_bits[slot]
+
+    def get_stored_move(self, key):
+        """Returns the best move code stored for the position, or 0."""
+        entry = self.probe(key)
+        return entry[3] if entry else 0
+
+    def hashfull(self):
+        """Per-mille of the first 1000 entries written during the current search."""
+        sample = min(1000, self.num_entries)
+        used = 0
+        for i in range(sample):
+            data = self.data[i]
+            if data and (data >> GENERATION_SHIFT) & 0xFF == self.generation:
+                used += 1
+        return used * 1000 // sample
 
     def clear(self):
-        self.table.clear()
+        size = self.num_entries * ENTRY_SIZE
+        self.buffer[:size] = bytes(size)
+        self.generation = 0
         self.hits = 0
-        self.collisions = 0
\ No newline at end of file
+        self.collisions = 0